@@ -0,0 +1,288 @@
+import asyncio
+import os
+from dataclasses import dataclass
+from functools import cache
+
+from semantic_kernel.kernel import Kernel
+from semantic_kernel.functions import KernelPlugin
+from semantic_kernel.agents import ChatCompletionAgent
+from semantic_kernel.contents import AuthorRole, ChatMessageContent
+from semantic_kernel.contents.function_result_content import FunctionResultContent
+from semantic_kernel.agents.strategies import (
+    SequentialSelectionStrategy,
+    DefaultTerminationStrategy
+)
+
+from clients import clients
+from history import strip_function_content
+from model_routing import model_router
+from rag import RAGPlugin
+from response_cache import conversation_context
+from streaming import StreamingAgentGroupChat
+from telemetry import telemetry
+from tool_memo import tool_results
+
+
+GITHUB_INSTRUCTIONS = """
+You are an expert on GitHub repositories. When answering questions, you **must** use the provided GitHub username to find specific information about that user's repositories, including:
+
+*   Who created the repositories
+*   The programming languages used
+*   Information found in files and README.md files within those repositories
+*   Provide links to each repository referenfced in your answers
+
+**Important:** Never perform general searches for repositories. Always use the given GitHub username to find the relevant information. If a GitHub username is not provided, state that you need a username to proceed.
+"""
+
+HACKATHON_AGENT = """
+You are an AI Agent Hackathon Strategist specializing in recommending winning project ideas.
+
+Your task:
+1. Analyze the GitHub activity of users to understand their technical skills
+2. Suggest creative AI Agent projects tailored to their expertise. 
+3. Focus on projects that align with Microsoft's AI Agent Hackathon prize categories
+
+When making recommendations:
+- Base your ideas strictly on the user's GitHub repositories, languages, and tools
+- Give suggestions on tools, languaghes and framweworks to use to build it. 
+- Provide detailed project descriptions including architecture and implementation approach
+- Explain why the project has potential to win in specific prize categories
+- Highlight technical feasibility given the user's demonstrated skills by referencing the specific repositories or languages used.
+
+Formatting your response:
+- Provide a clear and structured response that includes:
+    - Suggested Project Name
+    - Project Description 
+    - Potential languages and tools to use
+    - Link to each relevant GitHub repository you based your recommendation on
+
+Hackathon prize categories:
+- Best Overall Agent ($20,000)
+- Best Agent in Python ($5,000)
+- Best Agent in C# ($5,000)
+- Best Agent in Java ($5,000)
+- Best Agent in JavaScript/TypeScript ($5,000)
+- Best Copilot Agent using Microsoft Copilot Studio or Microsoft 365 Agents SDK ($5,000)
+- Best Azure AI Agent Service Usage ($5,000)
+        
+"""
+
+EVENTS_AGENT = """
+You are an Event Recommendation Agent specializing in suggesting relevant tech events.
+
+Your task:
+1. Review the project idea recommended by the Hackathon Agent
+2. Use the search_events function to find relevant events based on the technologies mentioned.
+3. NEVER suggest and event that the where there is not a relevant technology that the user has used.
+3. ONLY recommend events that were returned by the search_events functionf
+
+When making recommendations:
+- IMPORTANT: You must first call the search_events function with appropriate technology keywords from the project
+- Only recommend events that were explicitly returned by the search_events function
+- Do not make up or suggest events that weren't in the search results
+- Construct search queries using specific technologies mentioned (e.g., "Python AI workshop" or "JavaScript hackathon")
+- Try multiple search queries if needed to find the most relevant events
+
+
+For each recommended event:
+- Only include events found in the search_events results
+- Explain the direct connection between the event and the specific project requirements
+- Highlight relevant workshops, sessions, or networking opportunities
+
+Formatting your response:
+- Start with "Based on the hackathon project idea, here are relevant events that I found:"
+- Only list events that were returned by the search_events function
+- For each event, include the exact event details as returned by search_events
+- Explain specifically how each event relates to the project technologies
+
+If no relevant events are found, acknowledge this and suggest trying different search terms instead of making up events.
+"""
+
+# The EventsAgent of "dag" mode, which runs alongside the Hackathon Agent and so only sees the GitHub Agent's answer
+EVENTS_AGENT_DAG = """
+You are an Event Recommendation Agent specializing in suggesting relevant tech events.
+
+Your task:
+1. Review the languages, frameworks and tools the GitHub Agent found in the user's repositories
+2. Use the search_events function to find relevant events based on those technologies.
+3. NEVER suggest an event where there is not a relevant technology that the user has used.
+4. ONLY recommend events that were returned by the search_events function
+
+When making recommendations:
+- IMPORTANT: You must first call the search_events function with appropriate technology keywords from the user's repositories
+- Only recommend events that were explicitly returned by the search_events function
+- Do not make up or suggest events that weren't in the search results
+- Construct search queries using specific technologies the user has used (e.g., "Python AI workshop" or "JavaScript hackathon")
+- Try multiple search queries if needed to find the most relevant events
+
+
+For each recommended event:
+- Only include events found in the search_events results
+- Explain the direct connection between the event and the user's repositories
+- Highlight relevant workshops, sessions, or networking opportunities
+
+Formatting your response:
+- Start with "Based on your GitHub repositories, here are relevant events that I found:"
+- Only list events that were returned by the search_events function
+- For each event, include the exact event details as returned by search_events
+- Explain specifically how each event relates to the technologies in the user's repositories
+
+If no relevant events are found, acknowledge this and suggest trying different search terms instead of making up events.
+"""
+
+
+# "sequential" runs the agents in turn through AgentGroupChat; "dag" runs each agent
+# as soon as the agents it depends on have finished, concurrently where possible
+PIPELINE_MODE = os.getenv("AGENT_PIPELINE_MODE", "sequential").lower()
+
+
+@dataclass(frozen=True)
+class AgentTemplate:
+    """Everything about an agent that is the same for every session."""
+    name: str
+    instructions: str
+    plugins: tuple[str, ...] = ()
+    depends_on: tuple[str, ...] = ()
+    tier: str = "large"  # Model tier, see model_routing (overridable with MODEL_ROUTES)
+
+
+# The agents of the recommendation pipeline, in the order they take turns
+AGENT_TEMPLATES = (
+    AgentTemplate("GithubAgent", GITHUB_INSTRUCTIONS, ("github",)),
+    AgentTemplate("HackathonAgent", HACKATHON_AGENT, depends_on=("GithubAgent",)),
+    AgentTemplate("EventsAgent", EVENTS_AGENT, ("rag",), depends_on=("HackathonAgent",)),
+)
+
+# In "dag" mode the EventsAgent searches from the GitHub technologies directly,
+# so it runs alongside the HackathonAgent instead of after it
+DAG_AGENT_TEMPLATES = AGENT_TEMPLATES[:2] + (
+    AgentTemplate("EventsAgent", EVENTS_AGENT_DAG, ("rag",), depends_on=("GithubAgent",)),
+)
+
+
+@cache
+def rag_kernel_plugin() -> KernelPlugin:
+    """The RAG plugin holds no session state, so its function metadata is built once per process."""
+    return KernelPlugin.from_object(plugin_name="RAG", plugin_instance=RAGPlugin())
+
+
+def create_agent(template: AgentTemplate, plugins: dict, tool_limiter=None) -> ChatCompletionAgent:
+    """Instantiates a template for one session with that session's plugins."""
+    kernel = Kernel()
+    for plugin_key in template.plugins:
+        if plugins.get(plugin_key) is not None:
+            kernel.add_plugin(plugins[plugin_key])
+    telemetry.install(kernel)
+    if "github" in template.plugins:
+        tool_results.install(kernel)
+    if tool_limiter is not None and template.plugins:
+        tool_limiter.install(kernel)
+    return ChatCompletionAgent(
+        kernel=kernel,
+        service=clients.chat_completion(tier=model_router.tier_for(template.name, template.tier)),
+        name=template.name,
+        instructions=template.instructions,
+    )
+
+
+def create_agent_group_chat(plugins: dict, tool_limiter=None) -> StreamingAgentGroupChat:
+    """Creates the GitHub -> Hackathon -> Events group chat for one session."""
+    agents = [create_agent(template, plugins, tool_limiter) for template in AGENT_TEMPLATES]
+    return StreamingAgentGroupChat(
+        agents=agents,
+        selection_strategy=SequentialSelectionStrategy(
+            initial_agent=agents[0]),
+        termination_strategy=DefaultTerminationStrategy(maximum_iterations=3)
+    )
+
+
+async def run_cached_agent_sequence(group_chat: StreamingAgentGroupChat, user_input: str,
+                                   conversation: list[ChatMessageContent], cache):
+    """Runs the group chat's agents once each, in order, serving all but the first from `cache`.
+
+    The first agent (the GithubAgent) always runs; the responses after it are cached as
+    the flow "recommendation", keyed on the prompt, the `conversation` before it and the
+    tool results of the first agent's turn. A follow-up, or another user's GitHub data,
+    never reuses an answer. The user message must already be in the group chat.
+    """
+    first, *rest = group_chat.agents
+    start = len(group_chat.history.messages)
+    async for content in group_chat.invoke_stream(agent=first, is_joining=False):
+        yield content
+
+    tool_results = [str(item.result) for message in group_chat.history.messages[start:]
+                    for item in message.items if isinstance(item, FunctionResultContent)]
+    key = cache.make_key("recommendation", user_input, conversation_context(conversation), *tool_results)
+    cached = await cache.get(key)
+    if cached is not None:
+        for agent_name, response in cached:
+            message = ChatMessageContent(role=AuthorRole.ASSISTANT, name=agent_name, content=response)
+            await group_chat.add_chat_message(message)
+            yield message
+        return
+
+    responses = []
+    for agent in rest:
+        responses.append([agent.name, ""])
+        async for content in group_chat.invoke_stream(agent=agent, is_joining=False):
+            responses[-1][1] += content.content or ""
+            yield content
+    await cache.set(key, responses)
+
+
+def create_pipeline_agents(plugins: dict, tool_limiter=None) -> dict[str, ChatCompletionAgent]:
+    """Creates the agents for one session, keyed by name, for `run_agent_dag`."""
+    return {template.name: create_agent(template, plugins, tool_limiter) for template in DAG_AGENT_TEMPLATES}
+
+
+async def _invoke_with_inputs(agent: ChatCompletionAgent, user_input: str, inputs: list[ChatMessageContent],
+                              history: list[ChatMessageContent], cache=None) -> ChatMessageContent:
+    # Cached per agent on the conversation and prompt plus the outputs it builds on (e.g. the GitHub data)
+    key = None
+    if cache is not None and cache.enabled_for(agent.name):
+        key = cache.make_key(agent.name, user_input, conversation_context(history), *(m.content for m in inputs))
+        cached = await cache.get(key)
+        if cached is not None:
+            return ChatMessageContent(role=AuthorRole.ASSISTANT, name=agent.name, content=cached)
+
+    messages = list(history) + [ChatMessageContent(role=AuthorRole.USER, content=user_input)]
+    messages += [ChatMessageContent(role=AuthorRole.ASSISTANT, name=m.name, content=m.content) for m in inputs]
+    response = await agent.get_response(messages=messages)
+    if key is not None:
+        await cache.set(key, str(response.message.content))
+    return response.message
+
+
+async def run_agent_dag(agents: dict[str, ChatCompletionAgent], user_input: str,
+                        history: list[ChatMessageContent] = (),
+                        templates: tuple[AgentTemplate, ...] = DAG_AGENT_TEMPLATES, cache=None):
+    """Runs the agents by dependency, yielding each response as soon as it completes.
+
+    Every agent receives the conversation so far (`history`, without its tool calls),
+    then the user message and the responses of the agents in its `depends_on`. An agent
+    starts once all of those have answered; independent agents run concurrently.
+    With a `cache`, agents enabled in it reuse earlier responses to the same inputs.
+    """
+    history = strip_function_content(list(history))
+    outputs = {}
+    pending = {template.name: template for template in templates}
+    running = {}
+    try:
+        while pending or running:
+            for name, template in list(pending.items()):
+                if all(dep in outputs for dep in template.depends_on):
+                    inputs = [outputs[dep] for dep in template.depends_on]
+                    running[asyncio.create_task(
+                        _invoke_with_inputs(agents[name], user_input, inputs, history, cache))] = name
+                    del pending[name]
+            if not running:
+                raise ValueError(f"Unsatisfiable agent dependencies: {sorted(pending)}")
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = running.pop(task)
+                outputs[name] = task.result()
+                yield outputs[name]
+    finally:
+        for task in running:
+            task.cancel()
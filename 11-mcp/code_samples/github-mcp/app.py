@@ -1,5 +1,7 @@
 import os
 import json
+import asyncio
+import functools
 from dotenv import load_dotenv
 
 
@@ -7,133 +9,228 @@ import chainlit as cl
 from mcp import ClientSession
 
 from semantic_kernel.kernel import Kernel
-from azure.core.credentials import AzureKeyCredential
 
 
-from semantic_kernel.functions import KernelFunction, kernel_function
 from semantic_kernel.contents import ChatHistory, AuthorRole, ChatMessageContent
 from semantic_kernel.connectors.ai import FunctionChoiceBehavior
 from semantic_kernel.contents.function_call_content import FunctionCallContent
 from semantic_kernel.contents.function_result_content import FunctionResultContent
-from semantic_kernel.connectors.mcp import MCPStdioPlugin
-from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion
-from semantic_kernel.agents import ChatCompletionAgent, ChatHistoryAgentThread, AgentGroupChat
-from semantic_kernel.agents.strategies import (
-    SequentialSelectionStrategy,
-    DefaultTerminationStrategy
+
+# Load environment variables (before the local modules, which read their settings on import)
+load_dotenv()
+
+from agents import (
+    PIPELINE_MODE,
+    create_agent_group_chat,
+    create_pipeline_agents,
+    rag_kernel_plugin,
+    run_agent_dag,
+    run_cached_agent_sequence,
 )
+from clients import clients
+from history import HistoryManager, reduce_group_chat
+from llm_scheduler import request_context
+from indexing import start_bootstrap
+from mcp_pool import CheckedMCPStdioPlugin, MCPServerPool
+from model_routing import model_router
+from response_cache import response_cache
+from search_backends import close_backend
+from session_state import SessionManager, create_session_store, dump_messages, load_messages
+from streaming import TokenCoalescer
+from telemetry import telemetry
+from tool_catalog import server_key, tool_catalog
+from tool_execution import ToolLimiter
+from tool_memo import tool_results
+from tool_router import ToolRouter
+
+
+# GitHub MCP servers are shared by all sessions instead of spawning npx per chat.
+# Tool errors are raised, so they aren't memoized as results.
+github_pool = MCPServerPool(lambda: CheckedMCPStdioPlugin(
+    name="Github",
+    description="Github Plugin",
+    command="npx",
+    args=["-y", "@modelcontextprotocol/server-github"]
+))
 
-from azure.search.documents import SearchClient
-from azure.search.documents.indexes import SearchIndexClient
-from azure.search.documents.indexes.models import SearchIndex, SimpleField, SearchFieldDataType, SearchableField
 
+def flatten(xss):
+    return [x for xs in xss for x in xs]
 
-# Load environment variables
-load_dotenv()
 
+def session_key() -> str:
+    # The thread id survives reconnects and resumes, the websocket session id does not
+    return cl.context.session.thread_id or cl.context.session.id
 
-# Example Weather Plugin (Tool)
 
-        
+def session_objects() -> dict:
+    """The live objects (kernel, histories, agents...) of the current session; see `with_session`."""
+    return sessions.objects(session_key())
 
-class RAGPlugin:
-    def __init__(self, search_client):
-        self.search_client = search_client
 
-    @kernel_function(name="search_events", description="Searches for relevant events based on a query")
-    def search_events(self, query: str) -> str:
-        """Retrieves relevant events from Azure Search based on the query."""
-        try:
-            results = self.search_client.search(query, top=5)
-            context_strings = []
-            for result in results:
-                if 'content' in result:
-                    context_strings.append(f"Event: {result['content']}")
+def get_tool_limiter() -> ToolLimiter:
+    """Returns the session's tool concurrency limiter, creating it on first use."""
+    objects = session_objects()
+    if objects.get("tool_limiter") is None:
+        objects["tool_limiter"] = ToolLimiter()
+    return objects["tool_limiter"]
 
-            if context_strings:
-                return "\n\n".join(context_strings)
-            else:
-                return "No relevant events found."
-        except Exception as e:
-            return f"Error searching for events: {str(e)}"
 
+def session_plugins() -> dict:
+    return {"github": session_objects().get("github_plugin"), "rag": rag_kernel_plugin()}
 
-# Initialize Azure AI Search with persistent storage
-search_service_endpoint = os.getenv("AZURE_SEARCH_SERVICE_ENDPOINT")
-search_api_key = os.getenv("AZURE_SEARCH_API_KEY")
-index_name = "event-descriptions"
 
-search_client = SearchClient(
-    endpoint=search_service_endpoint,
-    index_name=index_name,
-    credential=AzureKeyCredential(search_api_key)
-)
+def get_agent_group_chat():
+    """Returns the session's agent group chat, creating it from the templates on first use."""
+    objects = session_objects()
+    if objects.get("agent_group_chat") is None:
+        objects["agent_group_chat"] = create_agent_group_chat(session_plugins(), get_tool_limiter())
+    return objects["agent_group_chat"]
+
+
+def get_pipeline_agents() -> dict:
+    """Returns the session's agents for the "dag" pipeline mode, creating them on first use."""
+    objects = session_objects()
+    if objects.get("pipeline_agents") is None:
+        objects["pipeline_agents"] = create_pipeline_agents(session_plugins(), get_tool_limiter())
+    return objects["pipeline_agents"]
+
+
+def get_tool_router() -> ToolRouter:
+    """Returns the session's tool routing index, creating it on first use."""
+    objects = session_objects()
+    if objects.get("tool_router") is None:
+        objects["tool_router"] = ToolRouter()
+    return objects["tool_router"]
 
-index_client = SearchIndexClient(
-    endpoint=search_service_endpoint,
-    credential=AzureKeyCredential(search_api_key)
-)
 
-# Define the index schema
-fields = [
-    SimpleField(name="id", type=SearchFieldDataType.String, key=True),
-    SearchableField(name="content", type=SearchFieldDataType.String)
-]
-
-index = SearchIndex(name=index_name, fields=fields)
-
-# Check if index already exists if not, create it
-try:
-    existing_index = index_client.get_index(index_name)
-    print(f"Index '{index_name}' already exists, using the existing index.")
-except Exception as e:
-    # Create the index if it doesn't exist
-    print(f"Creating new index '{index_name}'...")
-    index_client.create_index(index)
-
-# Always read event descriptions from markdown file
-with open("event-descriptions.md", "r") as f:
-    markdown_content = f.read()
-
-# Split the markdown content into individual event descriptions
-event_descriptions = markdown_content.split("---")  # You can change the delimiter
-
-# Create documents for Azure Search
-documents = []
-for i, description in enumerate(event_descriptions):
-    description = description.strip()  # Remove leading/trailing whitespace
-    if description:  # Avoid empty descriptions
-        documents.append({"id": str(i + 1), "content": description})
-
-# Add documents to the index (only if we have documents)
-if documents:
-    # Delete existing documents first to avoid duplicates
+async def build_session(state: dict | None) -> dict:
+    """Creates a session's kernel, agents and histories, restoring a stored state if there is one."""
+    # Create kernel
+    kernel = Kernel()
+
+    # Define service ID
+    service_id = "agent"
+
+    # Create and add chat completion service
+    # chat_completion_service = OpenAIChatCompletion(
+    #     ai_model_id="gpt-4o-mini",
+    #     async_client=client,
+    #     service_id=service_id
+    # )
+
+    sk_filter = cl.SemanticKernelFilter(kernel=kernel)
+
+    # Chat completion services share one process-wide HTTP connection pool.
+    # Regular chat answers on the large model tier, history summaries on the small one.
+    chat_completion_service = clients.chat_completion(service_id, model_router.tier_for(service_id, "large"))
+    summary_service = clients.chat_completion(tier=model_router.tier_for("summary", "small"))
+    kernel.add_service(chat_completion_service)
+    settings = kernel.get_prompt_execution_settings_from_service_id(
+        service_id=service_id)
+    settings.function_choice_behavior = FunctionChoiceBehavior.Auto()
+
+ 
+
+    # The RAG plugin is built once per process and shared by every session's kernel
+    kernel.add_plugin(rag_kernel_plugin())
+
+    # Lease a GitHub MCP plugin from the shared pool
+    github_plugin = None
     try:
-        search_client.delete_documents(documents=[{"id": doc["id"]} for doc in documents])
-        print("Cleared existing documents")
+        github_plugin = await github_pool.lease()
+
+        # Add the plugin to the kernel
+        kernel.add_plugin(github_plugin)
+
+        print("GitHub plugin added successfully")
     except Exception as e:
-        print(f"Warning: Failed to clear existing documents: {str(e)}")
-    
-    # Upload new documents
-    search_client.upload_documents(documents)
-    print(f"Uploaded {len(documents)} documents to index")
+        print(f"Error adding GitHub plugin: {str(e)}")
 
-def flatten(xss):
-    return [x for xs in xss for x in xs]
+    # Time every function call, serve read-only GitHub tools from the shared cache, then
+    # bound concurrent tool calls (and their duration) for the whole session
+    tool_limiter = ToolLimiter()
+    telemetry.install(kernel)
+    tool_results.install(kernel)
+    tool_limiter.install(kernel)
+
+    # Create a new chat history, kept within a token budget by the history manager
+    chat_history = ChatHistory()
+
+    # The plugin is kept with the session so it can be returned to the pool later
+    objects = {
+        "kernel": kernel,
+        "settings": settings,
+        "chat_completion_service": chat_completion_service,
+        "chat_history": chat_history,
+        "history_manager": HistoryManager(summary_service),
+        "github_plugin": github_plugin,
+        "tool_limiter": tool_limiter,
+        "tool_router": ToolRouter(),
+    }
+    if state:
+        chat_history.messages.extend(load_messages(state.get("history")))
+        for connection_name, connection in (state.get("mcp") or {}).items():
+            objects["tool_router"].add_connection(connection_name, connection["tools"], connection["server"])
+        if state.get("group"):
+            agent_group_chat = create_agent_group_chat(
+                {"github": github_plugin, "rag": rag_kernel_plugin()}, tool_limiter)
+            agent_group_chat.history.messages.extend(load_messages(state["group"]))
+            objects["agent_group_chat"] = agent_group_chat
+    return objects
+
+
+def snapshot_session(objects: dict) -> dict:
+    """The part of a session that can't be rebuilt: its histories and MCP tool listings."""
+    agent_group_chat = objects.get("agent_group_chat")
+    tool_router = objects["tool_router"]
+    return {
+        "history": dump_messages(objects["chat_history"].messages),
+        "group": dump_messages(agent_group_chat.history.messages) if agent_group_chat else None,
+        "mcp": {name: {"server": tool_router.servers[name], "tools": tools}
+                for name, tools in tool_router.tools.items()},
+    }
+
+
+def evict_session(objects: dict) -> None:
+    # Return the GitHub plugin to the pool; the pool owns the server process
+    github_plugin = objects.get("github_plugin")
+    if github_plugin:
+        github_pool.release(github_plugin)
+        print("GitHub plugin returned to pool")
+
+
+# Live session objects are rebuilt from the session store (SESSION_STORE) on demand
+# and evicted from memory when idle, so any worker can serve any session
+sessions = SessionManager(build_session, snapshot_session, evict_session, create_session_store())
+
+
+def with_session(handler):
+    """Runs a Chainlit handler with the session's objects live, storing its state afterwards."""
+    @functools.wraps(handler)
+    async def wrapper(*args, **kwargs):
+        # Model requests made by the handler are queued fairly against other sessions
+        with request_context(session=session_key()):
+            async with sessions.use(session_key()):
+                return await handler(*args, **kwargs)
+    return wrapper
 
 
 @cl.on_mcp_connect
+@with_session
 async def on_mcp(connection, session: ClientSession):
-    result = await session.list_tools()
-    tools = [{
-        "name": t.name,
-        "description": t.description,
-        "input_schema": t.inputSchema,
-    } for t in result.tools]
+    # Tool listings are cached per server across sessions and refreshed in the background
+    server = server_key(connection)
+    tools = await tool_catalog.get_tools(server, session)
+    conflicts = get_tool_router().add_connection(connection.name, tools, server)
+    if conflicts:
+        print(f"Warning: MCP {connection.name} exposes tools already served by another connection: {conflicts}")
+
 
-    mcp_tools = cl.user_session.get("mcp_tools", {})
-    mcp_tools[connection.name] = tools
-    cl.user_session.set("mcp_tools", mcp_tools)
+@cl.on_mcp_disconnect
+@with_session
+async def on_mcp_disconnect(name: str, session: ClientSession):
+    get_tool_router().remove_connection(name)
 
 
 @cl.step(type="tool")
@@ -145,20 +242,15 @@ async def call_tool(tool_use):
     current_step.name = tool_name
 
     # Identify which mcp is used
-    mcp_tools = cl.user_session.get("mcp_tools", {})
-    mcp_name = None
-
-    for connection_name, tools in mcp_tools.items():
-        if any(tool.get("name") == tool_name for tool in tools):
-            mcp_name = connection_name
-            break
+    tool_router = get_tool_router()
+    mcp_name = tool_router.route(tool_name)
 
     if not mcp_name:
         current_step.output = json.dumps(
             {"error": f"Tool {tool_name} not found in any MCP connection"})
         return current_step.output
 
-    mcp_session, _ = cl.context.session.mcp_sessions.get(mcp_name)
+    mcp_session, _ = cl.context.session.mcp_sessions.get(mcp_name, (None, None))
 
     if not mcp_session:
         current_step.output = json.dumps(
@@ -166,7 +258,13 @@ async def call_tool(tool_use):
         return current_step.output
 
     try:
-        current_step.output = await mcp_session.call_tool(tool_name, tool_input)
+        # Read-only tools are memoized per server; mutating tools always reach the server
+        with telemetry.span("function", function=f"{mcp_name}-{tool_name}"):
+            current_step.output = await tool_results.call(
+                tool_router.servers.get(mcp_name, mcp_name), tool_name, tool_input,
+                lambda: get_tool_limiter().run(mcp_session.call_tool(tool_name, tool_input)))
+    except asyncio.TimeoutError:
+        current_step.output = json.dumps({"error": f"Tool {tool_name} timed out"})
     except Exception as e:
         current_step.output = json.dumps({"error": str(e)})
 
@@ -175,253 +273,140 @@ async def call_tool(tool_use):
 
 @cl.on_chat_start
 async def on_chat_start():
- 
-    # Create kernel
-    kernel = Kernel()
-
-    # Define service ID
-    service_id = "agent"
-
-    # Create and add chat completion service
-    # chat_completion_service = OpenAIChatCompletion(
-    #     ai_model_id="gpt-4o-mini",
-    #     async_client=client,
-    #     service_id=service_id
-    # )
-
-    sk_filter = cl.SemanticKernelFilter(kernel=kernel)
-
-    kernel.add_service(AzureChatCompletion(service_id=service_id))
-    settings = kernel.get_prompt_execution_settings_from_service_id(
-        service_id=service_id)
-    settings.function_choice_behavior = FunctionChoiceBehavior.Auto()
-
- 
-
-    # Create a properly instantiated RAGPlugin
-    rag_plugin = RAGPlugin(search_client)
-
-    # Add to kernel
-    kernel.add_plugin(rag_plugin, plugin_name="RAG")
-
-    # Store in session
-    cl.user_session.set("rag_plugin", rag_plugin)
-
-    # Add GitHub MCP plugin
-    try:
-        # Create GitHub MCP plugin using MCPStdioPlugin
-        github_plugin = MCPStdioPlugin(
-            name="Github",
-            description="Github Plugin",
-            command="npx",
-            args=["-y", "@modelcontextprotocol/server-github"]
-        )
 
-        # Connect to the GitHub MCP server
-        await github_plugin.connect()
+    # Sync the events index once per process, without blocking this session.
+    # Only the Azure backend needs it; the local backends read event-descriptions.md directly.
+    if (os.getenv("EVENT_INDEX_ON_STARTUP", "true").lower() == "true"
+            and os.getenv("EVENT_SEARCH_BACKEND", "azure").lower() == "azure"):
+        start_bootstrap()
 
-        # Add the plugin to the kernel
-        kernel.add_plugin(github_plugin)
-
-        # Store the plugin in user session for cleanup later
-        cl.user_session.set("github_plugin", github_plugin)
-
-        print("GitHub plugin added successfully")
-    except Exception as e:
-        print(f"Error adding GitHub plugin: {str(e)}")
+    # Build the session's kernel, agents and histories (restored if the store has them)
+    await sessions.start(session_key())
 
-    GITHUB_INSTRUCTIONS = """
-You are an expert on GitHub repositories. When answering questions, you **must** use the provided GitHub username to find specific information about that user's repositories, including:
-
-*   Who created the repositories
-*   The programming languages used
-*   Information found in files and README.md files within those repositories
-*   Provide links to each repository referenfced in your answers
-
-**Important:** Never perform general searches for repositories. Always use the given GitHub username to find the relevant information. If a GitHub username is not provided, state that you need a username to proceed.
-    """
-
-    HACKATHON_AGENT = """
-You are an AI Agent Hackathon Strategist specializing in recommending winning project ideas.
-
-Your task:
-1. Analyze the GitHub activity of users to understand their technical skills
-2. Suggest creative AI Agent projects tailored to their expertise. 
-3. Focus on projects that align with Microsoft's AI Agent Hackathon prize categories
-
-When making recommendations:
-- Base your ideas strictly on the user's GitHub repositories, languages, and tools
-- Give suggestions on tools, languaghes and framweworks to use to build it. 
-- Provide detailed project descriptions including architecture and implementation approach
-- Explain why the project has potential to win in specific prize categories
-- Highlight technical feasibility given the user's demonstrated skills by referencing the specific repositories or languages used.
-
-Formatting your response:
-- Provide a clear and structured response that includes:
-    - Suggested Project Name
-    - Project Description 
-    - Potential languages and tools to use
-    - Link to each relevant GitHub repository you based your recommendation on
-
-Hackathon prize categories:
-- Best Overall Agent ($20,000)
-- Best Agent in Python ($5,000)
-- Best Agent in C# ($5,000)
-- Best Agent in Java ($5,000)
-- Best Agent in JavaScript/TypeScript ($5,000)
-- Best Copilot Agent using Microsoft Copilot Studio or Microsoft 365 Agents SDK ($5,000)
-- Best Azure AI Agent Service Usage ($5,000)
-        
-"""
-
-    EVENTS_AGENT = """
-You are an Event Recommendation Agent specializing in suggesting relevant tech events.
-
-Your task:
-1. Review the project idea recommended by the Hackathon Agent
-2. Use the search_events function to find relevant events based on the technologies mentioned.
-3. NEVER suggest and event that the where there is not a relevant technology that the user has used.
-3. ONLY recommend events that were returned by the search_events functionf
-
-When making recommendations:
-- IMPORTANT: You must first call the search_events function with appropriate technology keywords from the project
-- Only recommend events that were explicitly returned by the search_events function
-- Do not make up or suggest events that weren't in the search results
-- Construct search queries using specific technologies mentioned (e.g., "Python AI workshop" or "JavaScript hackathon")
-- Try multiple search queries if needed to find the most relevant events
-
-
-For each recommended event:
-- Only include events found in the search_events results
-- Explain the direct connection between the event and the specific project requirements
-- Highlight relevant workshops, sessions, or networking opportunities
-
-Formatting your response:
-- Start with "Based on the hackathon project idea, here are relevant events that I found:"
-- Only list events that were returned by the search_events function
-- For each event, include the exact event details as returned by search_events
-- Explain specifically how each event relates to the project technologies
-
-If no relevant events are found, acknowledge this and suggest trying different search terms instead of making up events.
-"""
-
-    github_agent = ChatCompletionAgent(
-        service=AzureChatCompletion(),
-        name="GithubAgent",
-        instructions=GITHUB_INSTRUCTIONS,
-        plugins=[github_plugin]
-    )
-
-    hackathon_agent = ChatCompletionAgent(
-        service=AzureChatCompletion(),
-        name="HackathonAgent",
-        instructions=HACKATHON_AGENT
-    )
-
-    events_agent = ChatCompletionAgent(
-        service=AzureChatCompletion(),
-        name="EventsAgent",
-        instructions=EVENTS_AGENT,
-        plugins=[rag_plugin]  # Add the plugin here
-    )
-
-    # Create the agent group chat
-    agent_group_chat = AgentGroupChat(
-        agents=[github_agent, hackathon_agent, events_agent],
-        selection_strategy=SequentialSelectionStrategy(
-            initial_agent=github_agent),
-        termination_strategy=DefaultTerminationStrategy(maximum_iterations=3)
-    )
-
-    # Create a new chat history
-    chat_history = ChatHistory()
 
-    # Store in user session
-    cl.user_session.set("kernel", kernel)
-    cl.user_session.set("settings", settings)  # Store settings in session
-    cl.user_session.set("chat_completion_service", AzureChatCompletion())
-    cl.user_session.set("chat_history", chat_history)
-    cl.user_session.set("mcp_tools", {})
-    # Store the agent group chat
-    cl.user_session.set("agent_group_chat", agent_group_chat)
+@cl.on_chat_resume
+async def on_chat_resume(thread):
+    # A resumed thread may land on any worker; its state comes back from the session store
+    await sessions.start(session_key())
 
 
 # Add a cleanup handler for when the session ends
 @cl.on_chat_end
 async def on_chat_end():
-    # Get the GitHub plugin if it exists
-    github_plugin = cl.user_session.get("github_plugin")
-    if github_plugin:
-        try:
-            await github_plugin.close()
-            print("GitHub plugin closed successfully")
-        except Exception as e:
-            print(f"Error closing GitHub plugin: {str(e)}")
+    # The stored state outlives the session (for resumes) until SESSION_STATE_TTL
+    await sessions.end(session_key())
+
+
+# Close the shared clients and MCP servers when the app stops (Chainlit versions with app hooks)
+if hasattr(cl, "on_app_shutdown"):
+    @cl.on_app_shutdown
+    async def on_app_shutdown():
+        await sessions.close()
+        await github_pool.close()
+        await close_backend()
+        await clients.close()
 
 
 @cl.on_message
+@telemetry.traced("turn")
+@with_session
 async def on_message(message: cl.Message):
-    kernel = cl.user_session.get("kernel")
-    chat_completion_service = cl.user_session.get("chat_completion_service")
-    chat_history = cl.user_session.get("chat_history")
-    settings = cl.user_session.get("settings")
-    agent_group_chat = cl.user_session.get("agent_group_chat")
-    sk_filter = cl.SemanticKernelFilter(kernel=kernel)
-
+    objects = session_objects()
+    kernel = objects["kernel"]
+    chat_completion_service = objects["chat_completion_service"]
+    chat_history = objects["chat_history"]
+    settings = objects["settings"]
+    history_manager = objects["history_manager"]
 
     # Check if the message is requesting a hackathon project recommendation
     user_input = message.content.lower()
     if "recommend" and "github" in user_input:
-        sk_filter = cl.SemanticKernelFilter(kernel=kernel)
-
         # Add user message to chat history
         chat_history.add_user_message(message.content)
 
-        # Add user message to the agent group chat's channel
-        await agent_group_chat.add_chat_message(message.content)
-
         # Create message for response stream - USE ONLY ONE MESSAGE OBJECT
         answer = cl.Message(content="Processing your request using GitHub, Hackathon and Events agents...\n\n")
         await answer.send()
 
-        agent_responses = []
-        async for content in agent_group_chat.invoke():
-            agent_name = content.name or "Agent"
-            response = f"**{agent_name}**: {content.content}"
-            agent_responses.append(response)
-            await answer.stream_token(f"{response}\n\n")
+        if PIPELINE_MODE == "dag":
+            # Each agent starts once its inputs are ready and is shown as soon as it completes
+            agent_group_chat = None
+            responses = run_agent_dag(get_pipeline_agents(), message.content, chat_history.messages[:-1],
+                                      cache=response_cache)
+        else:
+            # The group chat is only built the first time a message is routed to it
+            agent_group_chat = get_agent_group_chat()
+
+            # Add user message to the agent group chat's channel
+            await agent_group_chat.add_chat_message(message.content)
+
+            # Stream tokens as each agent generates them
+            if response_cache.enabled_for("recommendation"):
+                # The agents after the GithubAgent can be served from the response cache,
+                # keyed on this turn's GitHub data and the conversation before it
+                responses = run_cached_agent_sequence(
+                    agent_group_chat, message.content, chat_history.messages[:-1], response_cache)
+            else:
+                responses = agent_group_chat.invoke_stream()
 
-        # Add the full agent responses to chat history
-        full_response = "\n\n".join(agent_responses)
-        chat_history.add_assistant_message(full_response)
+        # Responses arrive as chunks tagged with the agent name; a new name starts a new section.
+        # Tokens are batched into fewer websocket frames and flushed at each agent boundary.
+        agent_responses = []
+        async with TokenCoalescer(answer) as stream:
+            async for content in responses:
+                agent_name = content.name or (agent_responses[-1][0] if agent_responses else "Agent")
+                if not agent_responses or agent_responses[-1][0] != agent_name:
+                    await stream.flush()
+                    agent_responses.append([agent_name, ""])
+                    separator = "\n\n" if len(agent_responses) > 1 else ""
+                    await stream.write(f"{separator}**{agent_name}**: ")
+                if content.content:
+                    agent_responses[-1][1] += content.content
+                    await stream.write(content.content)
+
+        # Add each agent's response as its own message so older ones can be summarized separately
+        for agent_name, response in agent_responses:
+            chat_history.add_message(ChatMessageContent(
+                role=AuthorRole.ASSISTANT, name=agent_name, content=response))
+
+        # Keep the chat history and the group chat's own history within budget
+        await history_manager.reduce(chat_history)
+        if agent_group_chat is not None:
+            await reduce_group_chat(history_manager, agent_group_chat)
+        full_response = "\n\n".join(f"**{agent_name}**: {response}" for agent_name, response in agent_responses)
 
         # Update the message with all responses
         answer.content = full_response
         await answer.update()
     else:
         # Regular processing for other messages
-        # Add user message to history
+        # Add user message to history and trim older turns to the token budget
         chat_history.add_user_message(message.content)
+        await history_manager.reduce(chat_history)
 
         # Create a Chainlit message for the response stream
         answer = cl.Message(content="")
 
-        async for msg in chat_completion_service.get_streaming_chat_message_content(
-            chat_history=chat_history,
-            user_input=message.content,
-            settings=settings,
-            kernel=kernel,
-        ):
-            if msg.content:
-                await answer.stream_token(msg.content)
-            # Handle function calls if they occur
-            if isinstance(msg, FunctionCallContent):
-                function_name = msg.function_name
-                function_arguments = msg.arguments
-                await answer.stream_token(f"\n\nCalling function: {function_name} with arguments: {function_arguments}\n\n")
-            # Handle function results
-            if isinstance(msg, FunctionResultContent):
-                await answer.stream_token(f"Function result: {msg.content}\n\n")
+        # Tokens are batched into fewer websocket frames; function calls and results flush the batch
+        async with TokenCoalescer(answer) as stream:
+            async for msg in chat_completion_service.get_streaming_chat_message_content(
+                chat_history=chat_history,
+                user_input=message.content,
+                settings=settings,
+                kernel=kernel,
+            ):
+                if msg.content:
+                    await stream.write(msg.content)
+                # Handle function calls if they occur
+                if isinstance(msg, FunctionCallContent):
+                    function_name = msg.function_name
+                    function_arguments = msg.arguments
+                    await stream.write(f"\n\nCalling function: {function_name} with arguments: {function_arguments}\n\n")
+                    await stream.flush()
+                # Handle function results
+                if isinstance(msg, FunctionResultContent):
+                    await stream.write(f"Function result: {msg.content}\n\n")
+                    await stream.flush()
 
         # Add the full assistant response to history
         chat_history.add_assistant_message(answer.content)
@@ -0,0 +1,83 @@
+"""A local MCP stdio server that mimics the tools of @modelcontextprotocol/server-github.
+
+Responses are canned JSON shaped like the GitHub API, returned after `--latency`
+seconds. Used by the benchmarks in place of `npx @modelcontextprotocol/server-github`.
+"""
+import argparse
+import asyncio
+import json
+
+from mcp.server.fastmcp import FastMCP
+
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument("--latency", type=float, default=0.1, help="Seconds per tool call")
+args = parser.parse_args()
+
+mcp = FastMCP("github")
+
+LANGUAGES = ["Python", "TypeScript", "C#", "Java", "Jupyter Notebook"]
+
+
+def repository(owner: str, i: int) -> dict:
+    return {
+        "id": 1000 + i,
+        "name": f"project-{i}",
+        "full_name": f"{owner}/project-{i}",
+        "owner": {"login": owner},
+        "html_url": f"https://github.com/{owner}/project-{i}",
+        "description": f"Sample {LANGUAGES[i % len(LANGUAGES)]} project number {i}",
+        "language": LANGUAGES[i % len(LANGUAGES)],
+        "stargazers_count": 10 * i,
+        "default_branch": "main",
+    }
+
+
+def owner_from_query(query: str) -> str:
+    for part in query.split():
+        if part.startswith("user:"):
+            return part[len("user:"):]
+    return "octocat"
+
+
+@mcp.tool()
+async def search_repositories(query: str, page: int = 1, perPage: int = 30) -> str:
+    """Search for GitHub repositories"""
+    await asyncio.sleep(args.latency)
+    owner = owner_from_query(query)
+    items = [repository(owner, i) for i in range(min(perPage, 5))]
+    return json.dumps({"total_count": len(items), "incomplete_results": False, "items": items})
+
+
+@mcp.tool()
+async def get_file_contents(owner: str, repo: str, path: str, branch: str | None = None) -> str:
+    """Get the contents of a file or directory from a GitHub repository"""
+    await asyncio.sleep(args.latency)
+    content = f"# {repo}\n\nA sample repository by {owner} using Python, Semantic Kernel and Azure OpenAI.\n"
+    return json.dumps({"type": "file", "name": path.rsplit("/", 1)[-1], "path": path, "content": content})
+
+
+@mcp.tool()
+async def list_commits(owner: str, repo: str, sha: str | None = None, page: int = 1, perPage: int = 30) -> str:
+    """Get list of commits of a branch in a GitHub repository"""
+    await asyncio.sleep(args.latency)
+    return json.dumps([{"sha": f"{i:040x}", "commit": {"message": f"Commit {i}", "author": {"name": owner}}}
+                       for i in range(min(perPage, 5))])
+
+
+@mcp.tool()
+async def list_issues(owner: str, repo: str, state: str = "open", page: int = 1, per_page: int = 30) -> str:
+    """List issues in a GitHub repository with filtering options"""
+    await asyncio.sleep(args.latency)
+    return json.dumps([{"number": i, "title": f"Issue {i}", "state": state} for i in range(1, 4)])
+
+
+@mcp.tool()
+async def create_issue(owner: str, repo: str, title: str, body: str = "") -> str:
+    """Create a new issue in a GitHub repository"""
+    await asyncio.sleep(args.latency)
+    return json.dumps({"number": 42, "title": title, "html_url": f"https://github.com/{owner}/{repo}/issues/42"})
+
+
+if __name__ == "__main__":
+    mcp.run()
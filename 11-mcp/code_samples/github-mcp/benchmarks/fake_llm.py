@@ -0,0 +1,139 @@
+"""A scripted OpenAI-compatible chat completions server for offline benchmarks.
+
+Serves both the Azure (`/openai/deployments/{deployment}/chat/completions`) and the
+OpenAI (`/v1/chat/completions`) routes, streaming or not. The first response to a
+request that offers a scripted tool (GitHub search, event search, weather) is a call to that
+tool; every other response is `tokens` words of text, sent after `latency` seconds
+at `tokens_per_second`. Run it standalone with `python fake_llm.py --port 8001`.
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+from aiohttp import web
+
+
+WORDS = ("the project could use semantic kernel agents with python and azure ai search to "
+         "recommend events based on the repositories languages and tools of the user").split()
+
+
+def scripted_arguments(tool_suffix: str, text: str) -> dict | None:
+    if tool_suffix == "search_events":
+        return {"query": "Python AI agents workshop"}
+    if tool_suffix == "search_repositories":
+        usernames = [word for word in text.split() if word.isidentifier() and word.lower() != "github"]
+        return {"query": f"user:{usernames[-1] if usernames else 'octocat'}"}
+    if tool_suffix == "get_weather":
+        places = [word.strip("?!.,") for word in text.split()[1:] if word[:1].isupper()]
+        return {"city": places[-1] if places else "Paris"}
+    return None
+
+
+class FakeLLM:
+    """Holds the timing settings and counts the calls it serves."""
+
+    def __init__(self, latency: float = 0.2, tokens_per_second: float = 100, tokens: int = 50):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.tokens = tokens
+        self.calls = 0
+        self.tool_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/openai/deployments/{deployment}/chat/completions", self.chat_completions)
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        app.router.add_post("/chat/completions", self.chat_completions)
+        return app
+
+    def plan(self, request: dict):
+        """Returns (tool name, arguments) for a scripted tool call, or None to answer with text."""
+        messages = request.get("messages", [])
+        last_user = max((i for i, m in enumerate(messages) if m.get("role") == "user"), default=-1)
+        text = str(messages[last_user].get("content") or "") if last_user >= 0 else ""
+        called = {call["function"]["name"]
+                  for m in messages[last_user + 1:] for call in (m.get("tool_calls") or [])}
+        tools = [tool["function"]["name"] for tool in request.get("tools") or []]
+        preferred = ("search_events", "search_repositories") if "event" in text.lower() else \
+            ("search_repositories", "search_events")
+        preferred += ("get_weather",)
+        for suffix in preferred:
+            for name in tools:
+                if name.endswith(suffix) and name not in called:
+                    return name, scripted_arguments(suffix, text)
+        return None
+
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        self.calls += 1
+        prompt_tokens = sum(len(str(m.get("content") or "")) for m in body.get("messages", [])) // 4 + 1
+        self.prompt_tokens += prompt_tokens
+        plan = self.plan(body)
+        words = [WORDS[i % len(WORDS)] + " " for i in range(self.tokens)] if plan is None else []
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(words),
+                 "total_tokens": prompt_tokens + len(words)}
+        self.completion_tokens += len(words)
+        tool_call = None
+        if plan is not None:
+            self.tool_calls += 1
+            tool_call = {"id": f"call_{uuid.uuid4().hex[:12]}", "type": "function",
+                         "function": {"name": plan[0], "arguments": json.dumps(plan[1])}}
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "created": int(time.time()),
+                "model": body.get("model") or request.match_info.get("deployment", "fake")}
+
+        await asyncio.sleep(self.latency)
+
+        if not body.get("stream"):
+            message = {"role": "assistant", "content": "".join(words) or None}
+            if tool_call is not None:
+                message["tool_calls"] = [tool_call]
+            return web.json_response({
+                **base, "object": "chat.completion",
+                "choices": [{"index": 0, "message": message,
+                             "finish_reason": "tool_calls" if tool_call else "stop"}],
+                "usage": usage,
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+
+        async def send(delta: dict, finish_reason=None, **extra):
+            chunk = {**base, "object": "chat.completion.chunk",
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}], **extra}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+
+        if tool_call is not None:
+            await send({"role": "assistant", "tool_calls": [{"index": 0, **tool_call}]})
+            await send({}, "tool_calls")
+        else:
+            await send({"role": "assistant", "content": ""})
+            for word in words:
+                await asyncio.sleep(1 / self.tokens_per_second)
+                await send({"content": word})
+            await send({}, "stop")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            await response.write(f"data: {json.dumps({**base, 'object': 'chat.completion.chunk', 'choices': [], 'usage': usage})}\n\n".encode("utf-8"))
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> tuple[web.AppRunner, str]:
+        """Starts the server in the running event loop and returns (runner, base url)."""
+        runner = web.AppRunner(self.app())
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner, f"http://{host}:{runner.addresses[0][1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=100)
+    parser.add_argument("--tokens", type=int, default=50, help="Words per text response")
+    args = parser.parse_args()
+    web.run_app(FakeLLM(args.latency, args.tokens_per_second, args.tokens).app(), host="127.0.0.1", port=args.port)
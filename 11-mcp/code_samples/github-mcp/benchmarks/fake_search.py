@@ -0,0 +1,17 @@
+import asyncio
+
+from search_backends import BM25Backend
+
+
+class FakeSearchBackend(BM25Backend):
+    """Stands in for Azure AI Search: the local BM25 index answered after a fixed network latency."""
+
+    name = "fake"
+
+    def __init__(self, latency: float = 0.05):
+        super().__init__()
+        self.latency = latency
+
+    async def search(self, query: str, top: int) -> list[dict]:
+        await asyncio.sleep(self.latency)
+        return await super().search(query, top)
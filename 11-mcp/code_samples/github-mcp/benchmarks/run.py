@@ -0,0 +1,266 @@
+"""Offline load test of the Chainlit handlers in app.py.
+
+Starts a fake OpenAI-compatible LLM server, a fake GitHub MCP server and a fake search
+backend, then drives `--sessions` concurrent simulated chat sessions through
+on_chat_start, `--turns` on_message calls each, and on_chat_end. Reports p50/p95/p99
+time-to-first-token and turn latency, LLM calls per turn, failed tool calls and memory
+per session. `--app concierge` runs the hotel concierge group chat of "12 - Chainlit"
+instead.
+
+    python benchmarks/run.py --sessions 20 --turns 3
+    python benchmarks/run.py --prompt "Recommend a hackathon project for GitHub user octocat"
+    python benchmarks/run.py --app concierge --prompt "What should I do in Paris?"
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+# Both apps have modules of the same names (app, clients, ...), so a run loads only one
+APP_DIRS = {
+    "github-mcp": os.path.dirname(BENCHMARKS_DIR),
+    "concierge": os.path.normpath(os.path.join(BENCHMARKS_DIR, "..", "..", "..", "..", "12 - Chainlit")),
+}
+DEFAULT_PROMPTS = {
+    "github-mcp": [
+        "What events are there for Python developers?",
+        "Recommend a hackathon project based on my GitHub username octocat",
+    ],
+    "concierge": [
+        "What should I do in Paris this weekend?",
+        "Recommend a local experience in London",
+    ],
+}
+
+from fake_llm import FakeLLM  # noqa: E402
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered) + 0.5) - 1))]
+
+
+def summarize(values: list[float]) -> dict:
+    return {"p50": percentile(values, 50), "p95": percentile(values, 95),
+            "p99": percentile(values, 99), "count": len(values)}
+
+
+def configure_environment(llm_url: str, options) -> None:
+    """Points app.py at the fakes. Must run before app.py is imported (it reads settings on import)."""
+    os.environ.update({
+        # Only validated by the settings (which require https); requests go to the
+        # fake server through the client set up by install_fakes
+        "AZURE_OPENAI_ENDPOINT": "https://benchmark.openai.azure.com/",
+        "AZURE_OPENAI_API_KEY": "benchmark",
+        "AZURE_OPENAI_API_VERSION": "2024-10-21",
+        "AZURE_OPENAI_CHAT_DEPLOYMENT_NAME": "fake-gpt",
+        "EVENT_SEARCH_BACKEND": "fake",
+        "EVENT_INDEX_ON_STARTUP": "false",
+        "AGENT_PIPELINE_MODE": options.pipeline_mode,
+        "RESPONSE_CACHE_AGENTS": options.response_cache,
+    })
+
+
+def install_fakes(app, llm_url: str, options) -> None:
+    """Points the shared model client, and the GitHub MCP pool and events search of
+    github-mcp, at the fakes."""
+    from clients import clients
+
+    if options.app == "concierge":
+        from openai import AsyncOpenAI
+
+        clients._openai_client = AsyncOpenAI(
+            base_url=f"{llm_url}/v1", api_key="benchmark", http_client=clients.http_client(), max_retries=0)
+        return
+
+    from openai import AsyncAzureOpenAI
+
+    import search_backends
+    from fake_search import FakeSearchBackend
+    from mcp_pool import CheckedMCPStdioPlugin, MCPServerPool
+
+    clients._openai_client = AsyncAzureOpenAI(
+        azure_endpoint=llm_url,
+        api_key="benchmark",
+        api_version=os.environ["AZURE_OPENAI_API_VERSION"],
+        http_client=clients.http_client(),
+        max_retries=0,
+    )
+    search_backends.BACKENDS[FakeSearchBackend.name] = lambda: FakeSearchBackend(options.search_latency)
+    app.github_pool = MCPServerPool(lambda: CheckedMCPStdioPlugin(
+        name="Github",
+        description="Github Plugin",
+        command=sys.executable,
+        args=[os.path.join(BENCHMARKS_DIR, "fake_github_mcp.py"), "--latency", str(options.mcp_latency)],
+    ))
+
+
+async def close_app(app, options) -> None:
+    from clients import clients
+
+    await app.sessions.close()
+    if options.app == "github-mcp":
+        from search_backends import close_backend
+
+        await app.github_pool.close()
+        await close_backend()
+    await clients.close()
+
+
+def tool_errors(sink) -> int:
+    """Function calls that failed; the model only sees these as an error result, so the turn still completes."""
+    return sum(1 for span in sink.spans if span.name == "function" and "error" in span.attributes)
+
+
+async def run_session(app, prompts: list[str], done: asyncio.Event, measured: asyncio.Event,
+                      results: dict) -> None:
+    import chainlit as cl
+    from chainlit.context import init_http_context
+    from chainlit.emitter import BaseChainlitEmitter
+
+    first_token = []
+
+    class RecordingEmitter(BaseChainlitEmitter):
+        """Discards everything sent to the UI, noting when each turn's first token arrives."""
+
+        async def send_token(self, id: str, token: str, is_sequence=False, is_input=False):
+            if not first_token:
+                first_token.append(time.perf_counter())
+
+    context = init_http_context()
+    context.emitter = RecordingEmitter(context.session)
+
+    await app.on_chat_start()
+    for prompt in prompts:
+        first_token.clear()
+        started = time.perf_counter()
+        try:
+            await app.on_message(cl.Message(content=prompt))
+        except Exception as e:
+            results["errors"].append(f"{type(e).__name__}: {e}")
+            continue
+        finished = time.perf_counter()
+        results["turn_latency"].append(finished - started)
+        if first_token:
+            results["ttft"].append(first_token[0] - started)
+
+    # Keep every session alive until memory has been measured
+    done.set()
+    await measured.wait()
+    await app.on_chat_end()
+
+
+async def main(options) -> dict:
+    fake_llm = FakeLLM(options.latency, options.tokens_per_second, options.tokens)
+    runner, llm_url = await fake_llm.start()
+    configure_environment(llm_url, options)
+    sys.path.insert(0, APP_DIRS[options.app])
+
+    import app
+    from telemetry import MemorySink, telemetry
+
+    install_fakes(app, llm_url, options)
+    sink = MemorySink()
+    telemetry.sinks.append(sink)
+
+    # Warm-up session: starts the MCP server and builds the shared plugins
+    warmup = {"ttft": [], "turn_latency": [], "errors": []}
+    warmed = asyncio.Event()
+    warmed.set()
+    await asyncio.create_task(run_session(app, options.prompt[:1], asyncio.Event(), warmed, warmup))
+    if warmup["errors"]:
+        raise RuntimeError(f"Warm-up turn failed: {warmup['errors'][0]}")
+    if tool_errors(sink):
+        raise RuntimeError(f"Warm-up turn had {tool_errors(sink)} failed tool calls")
+    calls_before = fake_llm.calls
+    sink.clear()
+
+    if options.memory:
+        tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0] if options.memory else 0
+
+    results = {"ttft": [], "turn_latency": [], "errors": []}
+    prompts = [options.prompt[i % len(options.prompt)] for i in range(options.turns)]
+    done = [asyncio.Event() for _ in range(options.sessions)]
+    measured = asyncio.Event()
+    started = time.perf_counter()
+    sessions = [asyncio.create_task(run_session(app, prompts, session_done, measured, results))
+                for session_done in done]
+    await asyncio.gather(*(session_done.wait() for session_done in done))
+    elapsed = time.perf_counter() - started
+
+    memory_per_session = None
+    if options.memory:
+        memory_per_session = (tracemalloc.get_traced_memory()[0] - baseline) / options.sessions
+        tracemalloc.stop()
+    measured.set()
+    await asyncio.gather(*sessions)
+
+    await close_app(app, options)
+    await runner.cleanup()
+
+    turns = len(results["turn_latency"])
+    return {
+        "app": options.app,
+        "sessions": options.sessions,
+        "turns": turns,
+        "errors": results["errors"],
+        "tool_errors": tool_errors(sink),
+        "elapsed_seconds": elapsed,
+        "turns_per_second": turns / elapsed if elapsed else None,
+        "ttft_seconds": summarize(results["ttft"]),
+        "turn_latency_seconds": summarize(results["turn_latency"]),
+        "llm_calls_per_turn": (fake_llm.calls - calls_before) / turns if turns else None,
+        "memory_per_session_bytes": memory_per_session,
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"{report['app']}: {report['sessions']} sessions, {report['turns']} turns in "
+          f"{report['elapsed_seconds']:.2f}s ({report['turns_per_second'] or 0:.2f} turns/s), "
+          f"{len(report['errors'])} errors, {report['tool_errors']} failed tool calls")
+    for label, key in (("time to first token", "ttft_seconds"), ("turn latency", "turn_latency_seconds")):
+        stats = report[key]
+        print(f"  {label:20} p50 {stats['p50'] * 1000:8.1f} ms   p95 {stats['p95'] * 1000:8.1f} ms   "
+              f"p99 {stats['p99'] * 1000:8.1f} ms")
+    if report["llm_calls_per_turn"] is not None:
+        print(f"  {'llm calls per turn':20} {report['llm_calls_per_turn']:.2f}")
+    if report["memory_per_session_bytes"] is not None:
+        print(f"  {'memory per session':20} {report['memory_per_session_bytes'] / 1024:.1f} KiB")
+    for error in sorted(set(report["errors"]))[:5]:
+        print(f"  error: {error}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", default="github-mcp", choices=sorted(APP_DIRS),
+                        help='App to drive: this sample, or the "12 - Chainlit" concierge group chat')
+    parser.add_argument("--sessions", type=int, default=10, help="Concurrent simulated sessions")
+    parser.add_argument("--turns", type=int, default=3, help="Messages sent by each session")
+    parser.add_argument("--prompt", action="append",
+                        help="Message to send (repeat for several; sessions cycle through them)")
+    parser.add_argument("--pipeline-mode", default="sequential", choices=["sequential", "dag"])
+    parser.add_argument("--response-cache", default="", help="RESPONSE_CACHE_AGENTS for the run")
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake LLM seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=100, help="Fake LLM token rate")
+    parser.add_argument("--tokens", type=int, default=50, help="Fake LLM words per text response")
+    parser.add_argument("--mcp-latency", type=float, default=0.1, help="Fake GitHub seconds per tool call")
+    parser.add_argument("--search-latency", type=float, default=0.05, help="Fake search seconds per query")
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="Skip tracemalloc (it slows the run down)")
+    parser.add_argument("--json", help="Also write the report to this file")
+    options = parser.parse_args()
+    options.prompt = options.prompt or DEFAULT_PROMPTS[options.app]
+
+    report = asyncio.run(main(options))
+    print_report(report)
+    if options.json:
+        with open(options.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
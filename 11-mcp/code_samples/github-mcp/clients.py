@@ -0,0 +1,90 @@
+import importlib.util
+import os
+
+import httpx
+from openai import AsyncAzureOpenAI
+from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion
+
+from llm_scheduler import ScheduledChatCompletion
+from model_routing import TierFallback, model_router
+from telemetry import ChatCompletionSpans
+
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+# HTTP/2 needs the optional `h2` package (pip install "httpx[http2]")
+HTTP2 = os.getenv("HTTP2", "true").lower() == "true" and importlib.util.find_spec("h2") is not None
+
+
+class InstrumentedAzureChatCompletion(ChatCompletionSpans, TierFallback, ScheduledChatCompletion, AzureChatCompletion):
+    """AzureChatCompletion for one model tier that records a telemetry span per request,
+    falls back to another tier on timeout and sends every request through llm_scheduler."""
+
+    tier: str = "large"
+
+    def fallback_service(self, tier: str) -> AzureChatCompletion:
+        return clients.chat_completion(self.service_id, tier)
+
+
+class ClientRegistry:
+    """Process-wide HTTP and model clients, shared by every session.
+
+    One keep-alive connection pool serves all chat completion services, so sessions
+    reuse open TLS connections instead of each opening their own.
+    """
+
+    def __init__(self):
+        self._http_client = None
+        self._openai_client = None
+        self._chat_completions = {}
+
+    def http_client(self) -> httpx.AsyncClient:
+        if self._http_client is None:
+            self._http_client = httpx.AsyncClient(
+                http2=HTTP2,
+                limits=httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+                ),
+                timeout=httpx.Timeout(60.0, connect=10.0),
+            )
+        return self._http_client
+
+    def openai_client(self) -> AsyncAzureOpenAI:
+        if self._openai_client is None:
+            self._openai_client = AsyncAzureOpenAI(
+                azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+                api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+                api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
+                http_client=self.http_client(),
+                # Retries (and Retry-After) are handled by llm_scheduler, across all requests
+                max_retries=0,
+            )
+        return self._openai_client
+
+    def chat_completion(self, service_id: str | None = None, tier: str = "large") -> AzureChatCompletion:
+        """Returns the shared AzureChatCompletion for a service id and model tier.
+
+        The deployment is MODEL_SMALL / MODEL_LARGE, or AZURE_OPENAI_CHAT_DEPLOYMENT_NAME when unset."""
+        key = (service_id, tier)
+        if key not in self._chat_completions:
+            service = InstrumentedAzureChatCompletion(
+                service_id=service_id,
+                deployment_name=model_router.model(tier),
+                async_client=self.openai_client(),
+            )
+            service.tier = tier
+            self._chat_completions[key] = service
+        return self._chat_completions[key]
+
+    async def close(self) -> None:
+        self._chat_completions.clear()
+        self._openai_client = None
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+
+clients = ClientRegistry()
@@ -0,0 +1,164 @@
+import os
+
+from semantic_kernel.contents import ChatHistory, AuthorRole, ChatMessageContent
+from semantic_kernel.contents.function_call_content import FunctionCallContent
+from semantic_kernel.contents.function_result_content import FunctionResultContent
+
+from llm_scheduler import BACKGROUND, request_context
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except ImportError:  # Fall back to the ~4 characters per token rule of thumb
+    _encoding = None
+
+
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "6000"))
+HISTORY_KEEP_RECENT = int(os.getenv("HISTORY_KEEP_RECENT", "6"))
+SUMMARY_PREFIX = "Summary of the earlier conversation:"
+SUMMARY_PROMPT = (
+    "Summarize the following conversation in a few short bullet points. Keep names, "
+    "GitHub usernames, cities, project ideas, event names and URLs; drop everything else."
+)
+
+
+def count_tokens(text: str) -> int:
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return len(text) // 4 + 1
+
+
+def message_text(message: ChatMessageContent) -> str:
+    parts = []
+    for item in message.items:
+        if isinstance(item, FunctionCallContent):
+            parts.append(f"{item.name}({item.arguments})")
+        elif isinstance(item, FunctionResultContent):
+            parts.append(str(item.result))
+        elif getattr(item, "text", None):
+            parts.append(item.text)
+    return "\n".join(parts) or (message.content or "")
+
+
+def message_tokens(message: ChatMessageContent) -> int:
+    return count_tokens(message_text(message)) + 4  # Per-message overhead
+
+
+def history_tokens(messages: list[ChatMessageContent]) -> int:
+    return sum(message_tokens(message) for message in messages)
+
+
+def is_function_message(message: ChatMessageContent) -> bool:
+    return message.role == AuthorRole.TOOL or any(
+        isinstance(item, (FunctionCallContent, FunctionResultContent)) for item in message.items)
+
+
+def strip_function_content(messages: list[ChatMessageContent]) -> list[ChatMessageContent]:
+    """Drops tool calls and their results, keeping any text the assistant wrote around them."""
+    stripped = []
+    for message in messages:
+        if not is_function_message(message):
+            stripped.append(message)
+            continue
+        items = [item for item in message.items
+                 if not isinstance(item, (FunctionCallContent, FunctionResultContent))]
+        if message.role != AuthorRole.TOOL and any(getattr(item, "text", None) for item in items):
+            stripped.append(ChatMessageContent(role=message.role, name=message.name, items=items))
+    return stripped
+
+
+def turn_boundary(messages: list[ChatMessageContent], index: int) -> int:
+    """Moves a split point back so a tool call is never separated from its result."""
+    while 0 < index < len(messages) and is_function_message(messages[index]):
+        index -= 1
+    return index
+
+
+class HistoryManager:
+    """Keeps a ChatHistory within a token budget.
+
+    Function calls and results are dropped once the turn that used them is over. When
+    the history is still over budget, the most recent messages are kept verbatim and
+    everything older is folded into a single summary message (or just dropped when no
+    service is available for summarizing).
+    """
+
+    def __init__(self, service=None, token_budget: int = HISTORY_TOKEN_BUDGET,
+                 keep_recent: int = HISTORY_KEEP_RECENT):
+        self.service = service
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self._last_summary = None  # (transcript, summary), reused for copies of the same history
+
+    async def reduce(self, chat_history: ChatHistory) -> bool:
+        """Reduces the history in place. Returns True if it changed."""
+        messages = list(chat_history.messages)
+
+        # Keep leading system messages (instructions) out of the reduction
+        head = 0
+        while (head < len(messages) and messages[head].role == AuthorRole.SYSTEM
+               and not (messages[head].content or "").startswith(SUMMARY_PREFIX)):
+            head += 1
+        pinned, body = messages[:head], messages[head:]
+
+        # Function results of earlier turns have already been used by the model
+        last_user = max((i for i, m in enumerate(body) if m.role == AuthorRole.USER), default=0)
+        body = strip_function_content(body[:last_user]) + body[last_user:]
+
+        if history_tokens(pinned + body) > self.token_budget:
+            split = turn_boundary(body, max(0, len(body) - self.keep_recent))
+            older, recent = body[:split], body[split:]
+            summary = await self._summarize(older) if older else None
+            body = ([ChatMessageContent(role=AuthorRole.SYSTEM, content=f"{SUMMARY_PREFIX}\n{summary}")]
+                    if summary else []) + recent
+
+            # Still too large: drop the oldest recent messages, always keeping the last turn
+            while len(body) > 1 and history_tokens(pinned + body) > self.token_budget:
+                split = 1
+                while split < len(body) and is_function_message(body[split]):
+                    split += 1
+                if split >= len(body):
+                    break
+                body = body[split:]
+
+        reduced = pinned + body
+        if len(reduced) == len(messages) and all(a is b for a, b in zip(reduced, messages)):
+            return False
+        chat_history.messages.clear()
+        chat_history.messages.extend(reduced)
+        return True
+
+    async def _summarize(self, messages: list[ChatMessageContent]) -> str | None:
+        if self.service is None:
+            return None
+        transcript = "\n".join(
+            f"{message.name or message.role.value}: {message_text(message)}" for message in messages)
+        if self._last_summary is not None and self._last_summary[0] == transcript:
+            return self._last_summary[1]
+        request = ChatHistory()
+        request.add_system_message(SUMMARY_PROMPT)
+        request.add_user_message(transcript)
+        try:
+            settings = self.service.get_prompt_execution_settings_class()()
+            # Summaries wait behind the requests of users who are waiting for an answer
+            with request_context(priority=BACKGROUND):
+                response = await self.service.get_chat_message_content(chat_history=request, settings=settings)
+            summary = str(response.content) if response else None
+            self._last_summary = (transcript, summary)
+            return summary
+        except Exception as e:
+            print(f"Warning: Failed to summarize chat history: {str(e)}")
+            return None
+
+
+async def reduce_group_chat(history_manager: HistoryManager, group_chat) -> None:
+    """Applies the budget to an AgentGroupChat's shared history, each agent channel and
+    the channel's thread, which is the history the agents' prompts are built from."""
+    await history_manager.reduce(group_chat.history)
+    for channel in group_chat.agent_channels.values():
+        if isinstance(channel, ChatHistory):
+            await history_manager.reduce(channel)
+        # ChatHistoryAgentThread only exposes its history for reading
+        thread_history = getattr(getattr(channel, "thread", None), "_chat_history", None)
+        if isinstance(thread_history, ChatHistory):
+            await history_manager.reduce(thread_history)
@@ -0,0 +1,262 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+
+from dotenv import load_dotenv
+from azure.core.credentials import AzureKeyCredential
+from azure.search.documents import SearchClient
+from azure.search.documents.indexes import SearchIndexClient
+from azure.search.documents.indexes.models import SearchIndex, SimpleField, SearchFieldDataType, SearchableField
+
+
+EVENTS_FILE = "event-descriptions.md"
+MANIFEST_FILE = ".event-index-manifest.json"
+LOCK_FILE = ".event-index.lock"
+LOCK_STALE_SECONDS = 300
+INDEX_NAME = "event-descriptions"
+BATCH_SIZE = int(os.getenv("EVENT_INDEX_BATCH_SIZE", "100"))
+# Bump when the document fields change so existing manifests trigger a full re-sync
+SCHEMA_VERSION = "2"
+
+# Define the index schema
+fields = [
+    SimpleField(name="id", type=SearchFieldDataType.String, key=True),
+    SearchableField(name="name", type=SearchFieldDataType.String, filterable=True, sortable=True),
+    SearchableField(name="description", type=SearchFieldDataType.String),
+    SimpleField(name="url", type=SearchFieldDataType.String, filterable=True),
+    SearchableField(name="content", type=SearchFieldDataType.String)
+]
+
+EVENT_PATTERN = re.compile(
+    r"##\s*Event Name:\s*(?P<name>.*?)\s*$"
+    r"(?:.*?##\s*Description\s*$(?P<description>.*?)(?=^##|\Z))?"
+    r"(?:.*?##\s*URL\s*$\s*<?(?P<url>[^\s>]+)>?)?",
+    re.MULTILINE | re.DOTALL
+)
+
+
+def event_id(content: str) -> str:
+    """Returns a stable document key derived from the event content."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()[:32]
+
+
+def parse_event(description: str) -> dict:
+    """Pulls the name, description and URL out of one markdown event block."""
+    match = EVENT_PATTERN.search(description)
+    if not match:
+        return {"name": "", "description": description, "url": ""}
+    return {
+        "name": match.group("name") or "",
+        "description": " ".join((match.group("description") or "").split()),
+        "url": match.group("url") or "",
+    }
+
+
+def load_event_documents(path: str = EVENTS_FILE) -> list[dict]:
+    """Reads the markdown file and returns one search document per event."""
+    with open(path, "r", encoding="utf-8") as f:
+        markdown_content = f.read()
+
+    # Split the markdown content into individual event descriptions
+    documents = {}
+    for description in markdown_content.split("---"):
+        description = description.strip()
+        if description:  # Avoid empty descriptions
+            doc_id = event_id(description)
+            documents[doc_id] = {"id": doc_id, "content": description, **parse_event(description)}
+    return list(documents.values())
+
+
+def source_hash(path: str = EVENTS_FILE) -> str:
+    """Hashes the events file so an unchanged corpus can skip the sync entirely."""
+    with open(path, "rb") as f:
+        return hashlib.sha256(SCHEMA_VERSION.encode() + f.read()).hexdigest()
+
+
+def load_manifest(path: str = MANIFEST_FILE) -> dict:
+    """Returns the manifest of indexed document ids, keyed by index name."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_manifest(manifest: dict, path: str = MANIFEST_FILE) -> None:
+    """Writes the manifest atomically so a crash never leaves a partial file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def diff_documents(documents: list[dict], indexed_ids: set[str],
+                   upload_all: bool = False) -> tuple[list[dict], list[str]]:
+    """Returns the documents to upload (all of them with `upload_all`) and the ids to delete."""
+    current_ids = {doc["id"] for doc in documents}
+    to_upload = [doc for doc in documents if upload_all or doc["id"] not in indexed_ids]
+    to_delete = sorted(indexed_ids - current_ids)
+    return to_upload, to_delete
+
+
+def batched(items: list, size: int = BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def ensure_index(index_client, index_name: str) -> str:
+    """Creates the index or adds missing fields. Returns "created", "updated" or "unchanged"."""
+    try:
+        existing_index = index_client.get_index(index_name)
+    except Exception:
+        print(f"Creating new index '{index_name}'...")
+        index_client.create_index(SearchIndex(name=index_name, fields=fields))
+        return "created"
+
+    existing_fields = {field.name for field in existing_index.fields}
+    missing_fields = [field for field in fields if field.name not in existing_fields]
+    if not missing_fields:
+        print(f"Index '{index_name}' already exists, using the existing index.")
+        return "unchanged"
+    print(f"Adding fields {[field.name for field in missing_fields]} to index '{index_name}'...")
+    existing_index.fields = list(existing_index.fields) + missing_fields
+    index_client.create_or_update_index(existing_index)
+    return "updated"
+
+
+def fetch_indexed_ids(search_client) -> set[str]:
+    """Lists the keys currently stored in the index (used when no manifest exists)."""
+    return {result["id"] for result in search_client.search("*", select=["id"])}
+
+
+def sync_index(search_client, index_name: str, documents: list[dict],
+               manifest_path: str = MANIFEST_FILE, reset: bool = False,
+               source: str | None = None, upload_all: bool = False) -> tuple[int, int]:
+    """Uploads new events and deletes removed ones. Returns (uploaded, deleted).
+
+    `reset` is for a new, empty index: everything is uploaded and nothing deleted.
+    `upload_all` re-uploads every document (e.g. after fields were added) while still
+    deleting the ones that are gone.
+    """
+    manifest = load_manifest(manifest_path)
+    if reset:
+        indexed_ids = set()
+    elif index_name in manifest:
+        indexed_ids = set(manifest[index_name])
+    else:
+        # No local record yet: reconcile against what the service already holds,
+        # which also cleans up documents indexed under the old positional ids.
+        indexed_ids = fetch_indexed_ids(search_client)
+
+    to_upload, to_delete = diff_documents(documents, indexed_ids, upload_all)
+
+    # Upload before deleting so the index is never empty while syncing
+    for batch in batched(to_upload):
+        search_client.merge_or_upload_documents(documents=batch)
+    for batch in batched(to_delete):
+        search_client.delete_documents(documents=[{"id": doc_id} for doc_id in batch])
+
+    manifest[index_name] = sorted(doc["id"] for doc in documents)
+    if source:
+        manifest.setdefault("sources", {})[index_name] = source
+    save_manifest(manifest, manifest_path)
+    return len(to_upload), len(to_delete)
+
+
+_index_listeners = []
+
+
+def add_index_listener(listener) -> None:
+    """Registers a callback that runs after the index content has changed."""
+    _index_listeners.append(listener)
+
+
+def create_clients(index_name: str = INDEX_NAME) -> tuple[SearchClient, SearchIndexClient]:
+    """Builds the sync search clients from the environment (no network calls)."""
+    endpoint = os.getenv("AZURE_SEARCH_SERVICE_ENDPOINT")
+    credential = AzureKeyCredential(os.getenv("AZURE_SEARCH_API_KEY"))
+    return (SearchClient(endpoint=endpoint, index_name=index_name, credential=credential),
+            SearchIndexClient(endpoint=endpoint, credential=credential))
+
+
+def acquire_lock(path: str = LOCK_FILE) -> bool:
+    """Takes a cross-process lock file. Returns False if another worker holds it."""
+    try:
+        if time.time() - os.path.getmtime(path) > LOCK_STALE_SECONDS:
+            os.remove(path)  # Left behind by a worker that crashed mid-sync
+    except FileNotFoundError:
+        pass
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+    with os.fdopen(fd, "w") as f:
+        f.write(str(os.getpid()))
+    return True
+
+
+def release_lock(path: str = LOCK_FILE) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def run_index(index_name: str = INDEX_NAME, events_path: str = EVENTS_FILE,
+              manifest_path: str = MANIFEST_FILE, force: bool = False) -> bool:
+    """Creates and syncs the index once. Returns False if skipped."""
+    source = source_hash(events_path)
+    manifest = load_manifest(manifest_path)
+    if not force and manifest.get("sources", {}).get(index_name) == source:
+        print(f"Index '{index_name}' is up to date with {events_path}")
+        return False
+
+    if not acquire_lock():
+        print(f"Another worker is indexing '{index_name}', skipping")
+        return False
+    try:
+        search_client, index_client = create_clients(index_name)
+        state = ensure_index(index_client, index_name)
+        documents = load_event_documents(events_path)
+        # Documents indexed before fields were added lack them, and an older index may
+        # still hold documents under other ids (e.g. the old positional ones)
+        uploaded, deleted = sync_index(search_client, index_name, documents, manifest_path,
+                                       reset=state == "created", source=source,
+                                       upload_all=state == "updated")
+        print(f"Indexed {len(documents)} events ({uploaded} uploaded, {deleted} deleted)")
+        if uploaded or deleted:
+            for listener in _index_listeners:
+                listener()
+        return True
+    finally:
+        release_lock()
+
+
+_bootstrap_task = None
+
+
+def start_bootstrap() -> asyncio.Task:
+    """Starts the one-time index bootstrap in the background of the running loop."""
+    global _bootstrap_task
+    if _bootstrap_task is None:
+        _bootstrap_task = asyncio.create_task(bootstrap_index())
+    return _bootstrap_task
+
+
+async def bootstrap_index() -> None:
+    """Runs the blocking index sync off the event loop. Failures never stop the app."""
+    try:
+        await asyncio.to_thread(run_index)
+    except Exception as e:
+        print(f"Warning: Failed to bootstrap index: {str(e)}")
+
+
+if __name__ == "__main__":
+    # python indexing.py [--force]  (run once per deployment)
+    import sys
+
+    load_dotenv()
+    run_index(force="--force" in sys.argv)
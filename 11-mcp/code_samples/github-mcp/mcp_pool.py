@@ -0,0 +1,159 @@
+import asyncio
+import os
+import time
+
+from semantic_kernel.connectors.mcp import MCPStdioPlugin
+from semantic_kernel.exceptions import FunctionExecutionException
+
+
+POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "2"))
+IDLE_TIMEOUT = float(os.getenv("MCP_POOL_IDLE_SECONDS", "600"))
+HEALTH_CHECK_INTERVAL = float(os.getenv("MCP_POOL_HEALTH_CHECK_SECONDS", "30"))
+PING_TIMEOUT = 5
+
+
+class CheckedMCPStdioPlugin(MCPStdioPlugin):
+    """MCPStdioPlugin that raises tool results flagged `isError`.
+
+    Semantic Kernel would hand them to the model as ordinary text; raised, the call is
+    reported as failed (telemetry) and its result is not memoized (tool_memo).
+    """
+
+    async def connect(self):
+        await super().connect()
+        call_tool = self.session.call_tool
+
+        async def checked_call_tool(name, *args, **kwargs):
+            result = await call_tool(name, *args, **kwargs)
+            if result.isError:
+                text = " ".join(getattr(item, "text", "") for item in result.content)
+                raise FunctionExecutionException(f"Tool '{name}' failed: {text}")
+            return result
+
+        self.session.call_tool = checked_call_tool
+
+
+class _PoolMember:
+    """One MCP server process. The plugin is opened and closed inside its own task,
+    because the stdio transport must be exited from the task that entered it."""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.plugin = None
+        self.leases = 0
+        self.last_used = time.monotonic()
+        self.last_checked = 0.0
+        self._task = None
+        self._stop = asyncio.Event()
+
+    async def start(self) -> None:
+        ready = asyncio.get_running_loop().create_future()
+        self._task = asyncio.create_task(self._run(ready))
+        await ready
+
+    async def _run(self, ready) -> None:
+        plugin = self.factory()
+        try:
+            async with plugin:
+                self.plugin = plugin
+                ready.set_result(None)
+                await self._stop.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                print(f"MCP server '{plugin.name}' exited: {str(e)}")
+        finally:
+            self.plugin = None
+
+    @property
+    def alive(self) -> bool:
+        return self.plugin is not None and self._task is not None and not self._task.done()
+
+    async def healthy(self) -> bool:
+        if not self.alive:
+            return False
+        if time.monotonic() - self.last_checked < HEALTH_CHECK_INTERVAL:
+            return True
+        try:
+            await asyncio.wait_for(self.plugin.session.send_ping(), timeout=PING_TIMEOUT)
+        except Exception:
+            return False
+        self.last_checked = time.monotonic()
+        return True
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            try:
+                await self._task
+            except Exception:
+                pass
+
+
+class MCPServerPool:
+    """A process-wide pool of connected MCP stdio plugins shared by chat sessions.
+
+    Sessions `lease()` a plugin and `release()` it when they end. MCP sessions handle
+    concurrent requests, so a plugin can be leased to several sessions at once; new
+    servers are only started while every running one is busy and the pool has room.
+    Dead servers are replaced on lease and idle ones are reaped in the background.
+    """
+
+    def __init__(self, factory, size: int = POOL_SIZE, idle_timeout: float = IDLE_TIMEOUT):
+        self.factory = factory
+        self.size = max(1, size)
+        self.idle_timeout = idle_timeout
+        self._members = []
+        self._lock = asyncio.Lock()
+        self._reaper = None
+
+    async def lease(self):
+        async with self._lock:
+            member = None
+            for candidate in sorted(self._members, key=lambda m: m.leases):
+                if await candidate.healthy():
+                    member = candidate
+                    break
+                print("Restarting unhealthy MCP server")
+                await candidate.stop()
+                self._members.remove(candidate)
+
+            if member is None or (member.leases > 0 and len(self._members) < self.size):
+                member = _PoolMember(self.factory)
+                await member.start()
+                self._members.append(member)
+
+            member.leases += 1
+            member.last_used = time.monotonic()
+            if self._reaper is None or self._reaper.done():
+                self._reaper = asyncio.create_task(self._reap())
+            return member.plugin
+
+    def release(self, plugin) -> None:
+        for member in self._members:
+            if member.plugin is plugin:
+                member.leases = max(0, member.leases - 1)
+                member.last_used = time.monotonic()
+                return
+
+    async def _reap(self) -> None:
+        while self._members:
+            await asyncio.sleep(min(self.idle_timeout, 60))
+            now = time.monotonic()
+            async with self._lock:
+                for member in list(self._members):
+                    if not member.alive or (member.leases == 0 and now - member.last_used > self.idle_timeout):
+                        await member.stop()
+                        self._members.remove(member)
+
+    async def close(self) -> None:
+        async with self._lock:
+            if self._reaper is not None:
+                self._reaper.cancel()
+            for member in self._members:
+                await member.stop()
+            self._members.clear()
+
+    def stats(self) -> dict:
+        return {"servers": len(self._members), "leases": sum(m.leases for m in self._members)}
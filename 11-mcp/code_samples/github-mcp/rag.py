@@ -0,0 +1,68 @@
+import asyncio
+import os
+
+from semantic_kernel.functions import kernel_function
+
+from cache import TTLCache
+from indexing import add_index_listener
+from search_backends import get_backend, tokenize
+from telemetry import annotate
+
+
+SEARCH_TIMEOUT = float(os.getenv("EVENT_SEARCH_TIMEOUT", "5"))
+SEARCH_TOP = 5
+# Maximum characters of each event description returned to the model
+RESULT_CHARS = int(os.getenv("EVENT_RESULT_CHARS", "400"))
+
+# Process-wide result cache. The corpus only changes when the indexer pushes new
+# content, which clears it; the TTL covers syncs done by another process.
+search_cache = TTLCache(
+    max_size=int(os.getenv("EVENT_SEARCH_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("EVENT_SEARCH_CACHE_TTL", "3600"))
+)
+add_index_listener(search_cache.clear)
+
+
+def format_event(event: dict, max_chars: int = RESULT_CHARS) -> str:
+    """Formats one event compactly, trimming the description to the character budget."""
+    description = event["description"]
+    if len(description) > max_chars:
+        description = description[:max_chars].rsplit(" ", 1)[0] + "..."
+    return f"Event: {event['name']}\nURL: {event['url']}\nDescription: {description}"
+
+
+def normalize_query(query: str) -> str:
+    """Folds case, punctuation, word order and simple plurals so near-identical queries share a key."""
+    return " ".join(sorted(set(tokenize(query))))
+
+
+class RAGPlugin:
+    def __init__(self, backend=None, top: int = SEARCH_TOP, timeout: float = SEARCH_TIMEOUT,
+                 max_chars: int = RESULT_CHARS):
+        self.backend = backend or get_backend()
+        self.top = top
+        self.timeout = timeout
+        self.max_chars = max_chars
+
+    @kernel_function(name="search_events", description="Searches for relevant events based on a query")
+    async def search_events(self, query: str) -> str:
+        """Retrieves relevant events from the configured search backend based on the query."""
+        key = (self.backend.name, normalize_query(query), self.top, self.max_chars)
+        cached = search_cache.get(key)
+        annotate(cache_hit=cached is not None)
+        if cached is not None:
+            return cached
+
+        try:
+            events = await asyncio.wait_for(self.backend.search(query, self.top), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            return f"Error searching for events: timed out after {self.timeout}s"
+        except Exception as e:
+            return f"Error searching for events: {str(e)}"
+
+        if events:
+            result = "\n\n".join(format_event(event, self.max_chars) for event in events)
+        else:
+            result = "No relevant events found."
+        search_cache.set(key, result)
+        return result
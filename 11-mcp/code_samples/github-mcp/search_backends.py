@@ -0,0 +1,169 @@
+import asyncio
+import math
+import os
+import re
+from collections import Counter
+
+from azure.core.credentials import AzureKeyCredential
+from azure.search.documents.aio import SearchClient
+
+from indexing import EVENTS_FILE, INDEX_NAME, load_event_documents
+
+try:
+    import numpy as np
+except ImportError:  # Only needed by the embedding backend
+    np = None
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercases and splits text, folding simple plurals ("workshops" -> "workshop")."""
+    tokens = []
+    for token in re.findall(r"[a-z0-9#+]+", text.lower()):
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+EVENT_FIELDS = ["name", "description", "url"]
+
+
+def event_text(document: dict) -> str:
+    """The text that local backends match against (the URL and markdown headers are left out)."""
+    return f"{document['name']} {document['description']}"
+
+
+class SearchBackend:
+    """Retrieval backend used by RAGPlugin. Returns the name, description and url of the top matches."""
+
+    name = "base"
+
+    async def search(self, query: str, top: int) -> list[dict]:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class AzureSearchBackend(SearchBackend):
+    """Azure AI Search over the shared async client (one connection pool per process)."""
+
+    name = "azure"
+
+    def __init__(self, index_name: str = INDEX_NAME):
+        self.search_client = SearchClient(
+            endpoint=os.getenv("AZURE_SEARCH_SERVICE_ENDPOINT"),
+            index_name=index_name,
+            credential=AzureKeyCredential(os.getenv("AZURE_SEARCH_API_KEY"))
+        )
+
+    async def search(self, query: str, top: int) -> list[dict]:
+        results = await self.search_client.search(
+            query, top=top, search_fields=["name", "description"], select=EVENT_FIELDS)
+        return [{field: result.get(field) or "" for field in EVENT_FIELDS} async for result in results]
+
+    async def close(self) -> None:
+        await self.search_client.close()
+
+
+class BM25Backend(SearchBackend):
+    """In-memory inverted index with BM25 scoring, built from event-descriptions.md."""
+
+    name = "bm25"
+
+    def __init__(self, documents: list[dict] | None = None, k1: float = 1.5, b: float = 0.75):
+        self.documents = documents if documents is not None else load_event_documents(EVENTS_FILE)
+        self.k1 = k1
+        self.b = b
+        self.postings = {}  # token -> [(doc index, term frequency)]
+        self.lengths = []
+        for i, document in enumerate(self.documents):
+            counts = Counter(tokenize(event_text(document)))
+            self.lengths.append(sum(counts.values()))
+            for token, tf in counts.items():
+                self.postings.setdefault(token, []).append((i, tf))
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+        n = len(self.documents)
+        self.idf = {token: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5))
+                    for token, p in self.postings.items()}
+
+    def rank(self, query: str, top: int) -> list[int]:
+        scores = {}
+        for token in set(tokenize(query)):
+            idf = self.idf.get(token)
+            if idf is None:
+                continue
+            for i, tf in self.postings[token]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[i] / self.avg_length)
+                scores[i] = scores.get(i, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores, key=scores.get, reverse=True)[:top]
+
+    async def search(self, query: str, top: int) -> list[dict]:
+        return [self.documents[i] for i in self.rank(query, top)]
+
+
+class EmbeddingBackend(SearchBackend):
+    """Cosine similarity over Azure OpenAI embeddings held in a NumPy matrix."""
+
+    name = "vector"
+
+    def __init__(self, documents: list[dict] | None = None):
+        if np is None:
+            raise ImportError("The vector search backend requires numpy: pip install numpy")
+        from openai import AsyncAzureOpenAI
+
+        self.documents = documents if documents is not None else load_event_documents(EVENTS_FILE)
+        self.deployment = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME")
+        self.client = AsyncAzureOpenAI(
+            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+            api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+            api_version=os.getenv("AZURE_OPENAI_API_VERSION")
+        )
+        self.matrix = None
+        self._build_lock = asyncio.Lock()
+
+    async def _embed(self, texts: list[str]):
+        response = await self.client.embeddings.create(model=self.deployment, input=texts)
+        vectors = np.array([item.embedding for item in response.data], dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    async def build(self) -> None:
+        async with self._build_lock:
+            if self.matrix is None:
+                self.matrix = await self._embed([event_text(doc) for doc in self.documents])
+
+    async def search(self, query: str, top: int) -> list[dict]:
+        if self.matrix is None:
+            await self.build()
+        scores = self.matrix @ (await self._embed([query]))[0]
+        return [self.documents[i] for i in np.argsort(-scores)[:top]]
+
+    async def close(self) -> None:
+        await self.client.close()
+
+
+BACKENDS = {
+    AzureSearchBackend.name: AzureSearchBackend,
+    BM25Backend.name: BM25Backend,
+    EmbeddingBackend.name: EmbeddingBackend,
+}
+
+_backend = None
+
+
+def get_backend() -> SearchBackend:
+    """Returns the process-wide backend selected by EVENT_SEARCH_BACKEND (default: azure)."""
+    global _backend
+    if _backend is None:
+        name = os.getenv("EVENT_SEARCH_BACKEND", AzureSearchBackend.name).lower()
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown EVENT_SEARCH_BACKEND '{name}', expected one of {sorted(BACKENDS)}")
+        _backend = BACKENDS[name]()
+    return _backend
+
+
+async def close_backend() -> None:
+    global _backend
+    if _backend is not None:
+        await _backend.close()
+        _backend = None
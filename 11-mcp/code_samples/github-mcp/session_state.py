@@ -0,0 +1,239 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import zlib
+from contextlib import asynccontextmanager, closing
+
+from semantic_kernel.contents import AuthorRole, ChatMessageContent
+
+from history import strip_function_content
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # Only needed by the Redis store
+    redis_asyncio = None
+
+
+STATE_VERSION = 1
+SESSION_STATE_TTL = float(os.getenv("SESSION_STATE_TTL", "86400"))
+SESSION_IDLE_SECONDS = float(os.getenv("SESSION_IDLE_SECONDS", "900"))
+
+
+def dump_messages(messages: list[ChatMessageContent]) -> list[list[str]]:
+    """Compact form of a history: [role, content] or [role, content, name] per message.
+
+    Function calls and results are left out; a snapshot is taken after the turn that
+    used them, and only the text the agents wrote around them is kept.
+    """
+    dumped = []
+    for message in strip_function_content(messages):
+        item = [message.role.value, message.content or ""]
+        if message.name:
+            item.append(message.name)
+        dumped.append(item)
+    return dumped
+
+
+def load_messages(data: list[list[str]]) -> list[ChatMessageContent]:
+    return [ChatMessageContent(role=AuthorRole(item[0]), content=item[1],
+                               name=item[2] if len(item) > 2 else None) for item in data or []]
+
+
+def encode_state(state: dict) -> bytes:
+    return zlib.compress(json.dumps({"v": STATE_VERSION, **state}, separators=(",", ":")).encode("utf-8"))
+
+
+def decode_state(blob: bytes | None) -> dict | None:
+    """Returns the stored state, or None when it is missing or from another version."""
+    if not blob:
+        return None
+    state = json.loads(zlib.decompress(blob))
+    return state if state.pop("v", None) == STATE_VERSION else None
+
+
+class SessionStore:
+    """Where serialized session state lives between turns, shared by every worker."""
+
+    name = "base"
+
+    async def get(self, key: str) -> bytes | None:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class SQLiteSessionStore(SessionStore):
+    """A SQLite file, for a single host or a shared volume."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str | None = None):
+        self.path = path or os.getenv("SESSION_STORE_PATH", ".session-state.sqlite")
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path)
+        db.execute("CREATE TABLE IF NOT EXISTS sessions (key TEXT PRIMARY KEY, value BLOB, expires REAL)")
+        return db
+
+    def _get(self, key: str) -> bytes | None:
+        with closing(self._connect()) as db:
+            row = db.execute("SELECT value, expires FROM sessions WHERE key = ?", (key,)).fetchone()
+        return row[0] if row is not None and row[1] >= time.time() else None
+
+    def _set(self, key: str, value: bytes, ttl: float) -> None:
+        now = time.time()
+        with closing(self._connect()) as db, db:
+            db.execute("INSERT OR REPLACE INTO sessions (key, value, expires) VALUES (?, ?, ?)",
+                       (key, value, now + ttl))
+            db.execute("DELETE FROM sessions WHERE expires < ?", (now,))
+
+    def _delete(self, key: str) -> None:
+        with closing(self._connect()) as db, db:
+            db.execute("DELETE FROM sessions WHERE key = ?", (key,))
+
+    async def get(self, key: str) -> bytes | None:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await asyncio.to_thread(self._set, key, value, ttl)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._delete, key)
+
+
+class RedisSessionStore(SessionStore):
+    """Redis, for workers spread over several hosts (requires `pip install redis`)."""
+
+    name = "redis"
+
+    def __init__(self, url: str | None = None):
+        if redis_asyncio is None:
+            raise ImportError("The Redis session store requires `pip install redis`")
+        self.client = redis_asyncio.from_url(url or os.getenv("SESSION_STORE_URL", "redis://localhost:6379/0"))
+
+    async def get(self, key: str) -> bytes | None:
+        return await self.client.get(f"session:{key}")
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self.client.set(f"session:{key}", value, ex=int(ttl))
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(f"session:{key}")
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+STORES = {
+    SQLiteSessionStore.name: SQLiteSessionStore,
+    RedisSessionStore.name: RedisSessionStore,
+}
+
+
+def create_session_store() -> SessionStore | None:
+    """The store selected by SESSION_STORE ("sqlite" or "redis"); None keeps state in process only."""
+    name = os.getenv("SESSION_STORE", "").lower()
+    if not name:
+        return None
+    if name not in STORES:
+        raise ValueError(f"Unknown SESSION_STORE '{name}', expected one of {sorted(STORES)}")
+    return STORES[name]()
+
+
+class _LiveSession:
+    def __init__(self):
+        self.objects = None
+        self.last_used = time.monotonic()
+        self.busy = 0
+        self.lock = asyncio.Lock()
+
+
+class SessionManager:
+    """Keeps the live objects of active sessions and their serialized state in a store.
+
+    `build(state)` creates a session's objects (kernel, histories, agents...) from a
+    stored state, or from scratch when it is None; `snapshot(objects)` returns the
+    JSON-compatible state to store. State is written after every use, so any worker
+    can pick a session up, and sessions idle for `idle_timeout` are evicted from
+    memory (`on_evict(objects)` releases what they hold) until their next message.
+    Without a store, sessions stay in memory until they end.
+    """
+
+    def __init__(self, build, snapshot, on_evict=None, store: SessionStore | None = None,
+                 ttl: float = SESSION_STATE_TTL, idle_timeout: float = SESSION_IDLE_SECONDS):
+        self.build = build
+        self.snapshot = snapshot
+        self.on_evict = on_evict
+        self.store = store
+        self.ttl = ttl
+        self.idle_timeout = idle_timeout
+        self.live = {}
+        self._reaper = None
+
+    def objects(self, key: str) -> dict:
+        """The live objects of a session that is currently in use."""
+        return self.live[key].objects
+
+    @asynccontextmanager
+    async def use(self, key: str):
+        """Rehydrates the session if needed, yields its objects and stores its state afterwards."""
+        session = self.live.setdefault(key, _LiveSession())
+        session.busy += 1
+        try:
+            async with session.lock:
+                if session.objects is None:
+                    state = decode_state(await self.store.get(key)) if self.store is not None else None
+                    session.objects = await self.build(state)
+            yield session.objects
+        finally:
+            session.busy -= 1
+            session.last_used = time.monotonic()
+            if self.store is not None and session.objects is not None:
+                try:
+                    await self.store.set(key, encode_state(self.snapshot(session.objects)), self.ttl)
+                except Exception as e:
+                    print(f"Warning: Failed to store session state: {str(e)}")
+                if self._reaper is None or self._reaper.done():
+                    self._reaper = asyncio.create_task(self._reap())
+
+    async def start(self, key: str) -> None:
+        """Builds or restores a session without running a turn (e.g. on chat start)."""
+        async with self.use(key):
+            pass
+
+    async def end(self, key: str) -> None:
+        """Drops a finished session from memory; its stored state expires after the TTL."""
+        session = self.live.pop(key, None)
+        if session is not None:
+            self._evict(session)
+
+    def _evict(self, session: _LiveSession) -> None:
+        objects, session.objects = session.objects, None
+        if objects is not None and self.on_evict is not None:
+            self.on_evict(objects)
+
+    async def _reap(self) -> None:
+        while self.live:
+            await asyncio.sleep(min(self.idle_timeout, 60))
+            now = time.monotonic()
+            for key, session in list(self.live.items()):
+                if not session.busy and now - session.last_used > self.idle_timeout:
+                    del self.live[key]
+                    self._evict(session)
+
+    async def close(self) -> None:
+        for key in list(self.live):
+            await self.end(key)
+        if self._reaper is not None:
+            self._reaper.cancel()
+        if self.store is not None:
+            await self.store.close()
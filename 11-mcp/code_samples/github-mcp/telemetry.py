@@ -0,0 +1,197 @@
+import functools
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from semantic_kernel.filters import FilterTypes, FunctionInvocationContext
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # Only needed by the OpenTelemetry sink
+    otel_trace = None
+
+
+@dataclass
+class Span:
+    """One timed stage of a turn: a chat completion, function call, selection or termination."""
+    name: str
+    attributes: dict
+    parent: "Span | None" = None
+    start: float = field(default_factory=time.perf_counter)
+    duration: float | None = None
+    handles: dict = field(default_factory=dict, repr=False)  # Per-sink state, e.g. the OpenTelemetry span
+
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def annotate(**attributes) -> None:
+    """Adds attributes (e.g. `cache_hit=True`) to the innermost open span, if any."""
+    span = _current_span.get()
+    if span is not None:
+        span.attributes.update(attributes)
+
+
+class LogSink:
+    """Logs each finished span on the "telemetry" logger at INFO level."""
+
+    def __init__(self, logger: logging.Logger | None = None):
+        self.logger = logger or logging.getLogger("telemetry")
+
+    def start(self, span: Span) -> None:
+        pass
+
+    def end(self, span: Span) -> None:
+        if self.logger.isEnabledFor(logging.INFO):
+            attributes = " ".join(f"{key}={value}" for key, value in span.attributes.items())
+            self.logger.info("%s %.1fms %s", span.name, span.duration * 1000, attributes)
+
+
+class MemorySink:
+    """Collects finished spans in a list, for tests and the benchmarks."""
+
+    def __init__(self):
+        self.spans = []
+
+    def start(self, span: Span) -> None:
+        pass
+
+    def end(self, span: Span) -> None:
+        self.spans.append(span)
+
+    def clear(self) -> None:
+        self.spans.clear()
+
+
+class OpenTelemetrySink:
+    """Exports spans through the globally configured OpenTelemetry tracer provider."""
+
+    def __init__(self, tracer_name: str = "semantic-kernel-app"):
+        if otel_trace is None:
+            raise ImportError("The OpenTelemetry sink requires `pip install opentelemetry-api`")
+        self.tracer = otel_trace.get_tracer(tracer_name)
+
+    def start(self, span: Span) -> None:
+        parent = span.parent.handles.get("otel") if span.parent is not None else None
+        context = otel_trace.set_span_in_context(parent) if parent is not None else None
+        span.handles["otel"] = self.tracer.start_span(span.name, context=context)
+
+    def end(self, span: Span) -> None:
+        otel_span = span.handles.pop("otel", None)
+        if otel_span is None:
+            return
+        for key, value in span.attributes.items():
+            otel_span.set_attribute(key, value if isinstance(value, (str, bool, int, float)) else str(value))
+        if "error" in span.attributes:
+            otel_span.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR, str(span.attributes["error"])))
+        otel_span.end()
+
+
+SINKS = {
+    "log": LogSink,
+    "memory": MemorySink,
+    "otel": OpenTelemetrySink,
+}
+
+
+class Telemetry:
+    """Records spans for every stage of a turn and hands them to the configured sinks.
+
+    `span()` times a block and nests under the enclosing span of the same task;
+    `install(kernel)` adds one function-invocation filter per kernel; `traced()` wraps a
+    coroutine function (e.g. a Chainlit handler) in a span.
+    """
+
+    def __init__(self, sinks=()):
+        self.sinks = list(sinks)
+
+    def __deepcopy__(self, memo):
+        # Kernel.clone() deep-copies its filters, and with them the bound _function_span;
+        # cloned kernels must still report to these sinks
+        return self
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        span = Span(name, attributes, _current_span.get())
+        token = _current_span.set(span)
+        for sink in self.sinks:
+            sink.start(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.attributes["error"] = type(e).__name__
+            raise
+        finally:
+            span.duration = time.perf_counter() - span.start
+            try:
+                _current_span.reset(token)
+            except ValueError:  # Closed from another context (e.g. an abandoned stream)
+                pass
+            for sink in self.sinks:
+                sink.end(span)
+
+    def traced(self, name: str):
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return await func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def install(self, kernel) -> None:
+        """Adds the function span filter to a kernel, once. Install it before other filters
+        so the span also covers cached results and timeouts."""
+        if any(existing == self._function_span for _, existing in kernel.function_invocation_filters):
+            return
+        kernel.add_filter(FilterTypes.FUNCTION_INVOCATION, self._function_span)
+
+    async def _function_span(self, context: FunctionInvocationContext, next):
+        # Function errors are raised out of next(), so span() records them
+        with self.span("function", function=context.function.fully_qualified_name):
+            await next(context)
+
+
+def record_usage(span: Span, messages) -> None:
+    """Copies token usage from the metadata of chat message contents onto a span."""
+    for message in messages or []:
+        usage = (getattr(message, "metadata", None) or {}).get("usage")
+        if usage is not None:
+            span.attributes["prompt_tokens"] = getattr(usage, "prompt_tokens", None)
+            span.attributes["completion_tokens"] = getattr(usage, "completion_tokens", None)
+
+
+class ChatCompletionSpans:
+    """Mixin for Semantic Kernel chat completion services that records a span per request,
+    with the time to first chunk when streaming and the token usage reported by the model."""
+
+    async def _inner_get_chat_message_contents(self, *args, **kwargs):
+        with telemetry.span("chat_completion", service=self.service_id, model=self.ai_model_id) as span:
+            messages = await super()._inner_get_chat_message_contents(*args, **kwargs)
+            record_usage(span, messages)
+            return messages
+
+    async def _inner_get_streaming_chat_message_contents(self, *args, **kwargs):
+        with telemetry.span("chat_completion", service=self.service_id, model=self.ai_model_id,
+                            stream=True) as span:
+            async for messages in super()._inner_get_streaming_chat_message_contents(*args, **kwargs):
+                if "ttft_ms" not in span.attributes:
+                    span.attributes["ttft_ms"] = round((time.perf_counter() - span.start) * 1000, 1)
+                record_usage(span, messages)
+                yield messages
+
+
+def create_telemetry() -> Telemetry:
+    """Configured from the environment: TELEMETRY_SINKS is a comma separated list of
+    "log", "otel" and "memory" (default "log"; empty disables span export)."""
+    names = [name.strip().lower() for name in os.getenv("TELEMETRY_SINKS", "log").split(",") if name.strip()]
+    unknown = [name for name in names if name not in SINKS]
+    if unknown:
+        raise ValueError(f"Unknown TELEMETRY_SINKS {unknown}, expected some of {sorted(SINKS)}")
+    return Telemetry([SINKS[name]() for name in names])
+
+
+telemetry = create_telemetry()
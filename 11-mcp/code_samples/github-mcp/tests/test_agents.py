@@ -0,0 +1,45 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import Field  # noqa: E402
+from semantic_kernel.agents import ChatCompletionAgent  # noqa: E402
+from semantic_kernel.connectors.ai.chat_completion_client_base import ChatCompletionClientBase  # noqa: E402
+from semantic_kernel.contents import AuthorRole, ChatMessageContent, FunctionCallContent  # noqa: E402
+
+from agents import DAG_AGENT_TEMPLATES, run_agent_dag  # noqa: E402
+
+
+class RecordingChatCompletion(ChatCompletionClientBase):
+    """Answers with the agent's name and records the history each agent was sent."""
+
+    prompts: dict = Field(default_factory=dict)
+
+    async def _inner_get_chat_message_contents(self, chat_history, settings):
+        name = chat_history.messages[0].name
+        self.prompts[name] = [message.content for message in chat_history.messages[1:]]
+        return [ChatMessageContent(role=AuthorRole.ASSISTANT, content=f"{name} answer")]
+
+
+def test_dag_agents_receive_the_conversation_and_their_inputs():
+    service = RecordingChatCompletion(ai_model_id="fake")
+    agents = {template.name: ChatCompletionAgent(service=service, name=template.name, instructions="Be brief.")
+              for template in DAG_AGENT_TEMPLATES}
+    history = [
+        ChatMessageContent(role=AuthorRole.USER, content="I mostly write Python"),
+        ChatMessageContent(role=AuthorRole.ASSISTANT, items=[
+            FunctionCallContent(id="call_1", name="Github-search_repositories", arguments="{}")]),
+        ChatMessageContent(role=AuthorRole.ASSISTANT, content="Noted."),
+    ]
+
+    async def run():
+        return [message.name async for message in run_agent_dag(agents, "Recommend events for octocat", history)]
+
+    assert asyncio.run(run())[0] == "GithubAgent"
+    # The earlier turns come first, without their tool calls
+    assert service.prompts["GithubAgent"] == ["I mostly write Python", "Noted.", "Recommend events for octocat"]
+    # The EventsAgent runs alongside the HackathonAgent, from the GitHub data alone
+    assert service.prompts["EventsAgent"][-1] == "GithubAgent answer"
+    assert "HackathonAgent answer" not in service.prompts["EventsAgent"]
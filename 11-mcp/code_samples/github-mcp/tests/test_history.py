@@ -0,0 +1,64 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import Field  # noqa: E402
+from semantic_kernel.agents import ChatCompletionAgent  # noqa: E402
+from semantic_kernel.agents.strategies import DefaultTerminationStrategy, SequentialSelectionStrategy  # noqa: E402
+from semantic_kernel.connectors.ai.chat_completion_client_base import ChatCompletionClientBase  # noqa: E402
+from semantic_kernel.contents import AuthorRole, ChatMessageContent, StreamingChatMessageContent  # noqa: E402
+
+from history import HistoryManager, history_tokens, reduce_group_chat  # noqa: E402
+from streaming import StreamingAgentGroupChat  # noqa: E402
+
+
+class RecordingChatCompletion(ChatCompletionClientBase):
+    """Answers every request with a fixed reply and records the history it was sent."""
+
+    reply: str = "word " * 40
+    prompts: list = Field(default_factory=list)
+
+    async def _inner_get_chat_message_contents(self, chat_history, settings):
+        return [ChatMessageContent(role=AuthorRole.ASSISTANT, content="A short summary.")]
+
+    async def _inner_get_streaming_chat_message_contents(self, chat_history, settings, function_invoke_attempt=0):
+        self.prompts.append(list(chat_history.messages))
+        yield [StreamingChatMessageContent(role=AuthorRole.ASSISTANT, choice_index=0, content=self.reply)]
+
+
+async def run_turns(turns: int, reduce: bool) -> RecordingChatCompletion:
+    service = RecordingChatCompletion(ai_model_id="fake")
+    agents = [ChatCompletionAgent(service=service, name=name, instructions="Be brief.")
+              for name in ("FirstAgent", "SecondAgent")]
+    group_chat = StreamingAgentGroupChat(
+        agents=agents,
+        selection_strategy=SequentialSelectionStrategy(initial_agent=agents[0]),
+        termination_strategy=DefaultTerminationStrategy(maximum_iterations=2),
+    )
+    history_manager = HistoryManager(service, token_budget=300, keep_recent=2)
+    for turn in range(turns):
+        await group_chat.add_chat_message(ChatMessageContent(role=AuthorRole.USER, content=f"Question {turn}"))
+        async for _ in group_chat.invoke_stream():
+            pass
+        if reduce:
+            await reduce_group_chat(history_manager, group_chat)
+    return service
+
+
+def test_streamed_replies_reach_the_group_chat_history():
+    service = asyncio.run(run_turns(turns=1, reduce=False))
+    # The second agent's prompt holds the first agent's reply (plus its instructions)
+    assert any(message.name == "FirstAgent" for message in service.prompts[1])
+
+
+def test_agent_prompts_stay_within_the_history_budget():
+    unreduced = asyncio.run(run_turns(turns=6, reduce=False))
+    reduced = asyncio.run(run_turns(turns=6, reduce=True))
+
+    assert len(unreduced.prompts[-1]) > len(unreduced.prompts[1])
+    # Each prompt is the reduced history plus at most this turn's messages
+    turn_tokens = history_tokens(reduced.prompts[1])
+    for prompt in reduced.prompts[2:]:
+        assert history_tokens(prompt) <= 300 + turn_tokens
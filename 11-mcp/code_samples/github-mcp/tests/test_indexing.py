@@ -0,0 +1,83 @@
+import os
+import sys
+from types import SimpleNamespace
+
+SAMPLE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SAMPLE_DIR)
+
+import indexing  # noqa: E402
+
+EVENTS_PATH = os.path.join(SAMPLE_DIR, indexing.EVENTS_FILE)
+
+
+class FakeIndexClient:
+    def __init__(self, field_names=None):
+        self.index = None if field_names is None else SimpleNamespace(
+            fields=[SimpleNamespace(name=name) for name in field_names])
+
+    def get_index(self, name):
+        if self.index is None:
+            raise LookupError(name)
+        return self.index
+
+    def create_index(self, index):
+        self.index = index
+
+    def create_or_update_index(self, index):
+        self.index = index
+
+
+class FakeSearchClient:
+    def __init__(self, documents=()):
+        self.documents = {doc["id"]: doc for doc in documents}
+
+    def search(self, text, select=None):
+        return [{"id": doc_id} for doc_id in self.documents]
+
+    def merge_or_upload_documents(self, documents):
+        for doc in documents:
+            self.documents[doc["id"]] = {**self.documents.get(doc["id"], {}), **doc}
+
+    def delete_documents(self, documents):
+        for doc in documents:
+            del self.documents[doc["id"]]
+
+
+def run_index(monkeypatch, tmp_path, search_client, index_client):
+    monkeypatch.chdir(tmp_path)  # The lock file
+    monkeypatch.setattr(indexing, "create_clients", lambda index_name: (search_client, index_client))
+    assert indexing.run_index(events_path=EVENTS_PATH, manifest_path=str(tmp_path / "manifest.json"))
+
+
+def test_new_index_gets_every_event(monkeypatch, tmp_path):
+    search_client = FakeSearchClient()
+    run_index(monkeypatch, tmp_path, search_client, FakeIndexClient())
+
+    events = indexing.load_event_documents(EVENTS_PATH)
+    assert set(search_client.documents) == {doc["id"] for doc in events}
+
+
+def test_added_fields_reupload_and_remove_positional_documents(monkeypatch, tmp_path):
+    # The original index: id and content only, keyed by position in the file
+    events = indexing.load_event_documents(EVENTS_PATH)
+    search_client = FakeSearchClient(
+        {"id": str(i + 1), "content": doc["content"]} for i, doc in enumerate(events))
+    index_client = FakeIndexClient(["id", "content"])
+
+    run_index(monkeypatch, tmp_path, search_client, index_client)
+
+    assert {field.name for field in index_client.index.fields} == {field.name for field in indexing.fields}
+    assert set(search_client.documents) == {doc["id"] for doc in events}
+    assert all(doc["name"] for doc in search_client.documents.values())
+
+
+def test_added_fields_reupload_documents_from_the_manifest(monkeypatch, tmp_path):
+    events = indexing.load_event_documents(EVENTS_PATH)
+    stale = {"id": "gone", "content": "A removed event"}
+    search_client = FakeSearchClient([stale] + [{"id": doc["id"], "content": doc["content"]} for doc in events])
+    indexing.save_manifest({indexing.INDEX_NAME: sorted(search_client.documents)}, str(tmp_path / "manifest.json"))
+
+    run_index(monkeypatch, tmp_path, search_client, FakeIndexClient(["id", "content"]))
+
+    assert "gone" not in search_client.documents
+    assert all("name" in doc for doc in search_client.documents.values())
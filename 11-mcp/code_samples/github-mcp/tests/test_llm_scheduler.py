@@ -0,0 +1,142 @@
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+import openai
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from semantic_kernel.connectors.ai.prompt_execution_settings import PromptExecutionSettings  # noqa: E402
+from semantic_kernel.contents import ChatHistory  # noqa: E402
+from semantic_kernel.exceptions import ServiceResponseException  # noqa: E402
+
+import llm_scheduler  # noqa: E402
+import model_routing  # noqa: E402
+from llm_scheduler import BACKGROUND, INTERACTIVE, LLMScheduler, ScheduledChatCompletion, request_context  # noqa: E402
+from model_routing import ModelRouter, TierFallback  # noqa: E402
+
+
+async def served_order(scheduler: LLMScheduler, requests: list[tuple[str, str, int]]) -> list[str]:
+    """Queues `requests` (name, session, priority) in order behind a held slot and
+    returns the order they are served in once it is released."""
+    served = []
+
+    async def request(name, session, priority):
+        with request_context(session=session, priority=priority):
+            async with scheduler.slot(1):
+                served.append(name)
+
+    async with scheduler.slot(1):
+        tasks = []
+        for name, session, priority in requests:
+            tasks.append(asyncio.create_task(request(name, session, priority)))
+            await asyncio.sleep(0)  # Queued in this order
+    await asyncio.gather(*tasks)
+    return served
+
+
+def test_sessions_are_served_round_robin():
+    requests = [("a1", "a", INTERACTIVE), ("a2", "a", INTERACTIVE), ("a3", "a", INTERACTIVE),
+                ("b1", "b", INTERACTIVE), ("c1", "c", INTERACTIVE)]
+    served = asyncio.run(served_order(LLMScheduler(concurrency=1), requests))
+    assert served == ["a1", "b1", "c1", "a2", "a3"]
+
+
+def test_background_requests_wait_for_interactive_ones():
+    requests = [("summary", "a", BACKGROUND), ("answer1", "b", INTERACTIVE), ("answer2", "a", INTERACTIVE)]
+    served = asyncio.run(served_order(LLMScheduler(concurrency=1), requests))
+    assert served == ["answer1", "answer2", "summary"]
+
+
+def test_cancelled_waiter_passes_the_slot_on():
+    async def run():
+        scheduler = LLMScheduler(concurrency=1)
+        served = []
+
+        async def request(name):
+            async with scheduler.slot(1):
+                served.append(name)
+
+        async with scheduler.slot(1):
+            cancelled = asyncio.create_task(request("cancelled"))
+            waiting = asyncio.create_task(request("waiting"))
+            await asyncio.sleep(0)
+            cancelled.cancel()
+        await asyncio.gather(waiting, cancelled, return_exceptions=True)
+        return served, scheduler.available
+
+    assert asyncio.run(run()) == (["waiting"], 1)
+
+
+def rate_limit_error(headers: dict) -> ServiceResponseException:
+    """A 429 wrapped the way Semantic Kernel's OpenAI connector raises it."""
+    request = httpx.Request("POST", "https://example.invalid/chat/completions")
+    response = httpx.Response(429, headers=headers, request=request)
+    try:
+        raise openai.RateLimitError("Too many requests", response=response, body=None)
+    except openai.RateLimitError as e:
+        try:
+            raise ServiceResponseException("Chat completion failed") from e
+        except ServiceResponseException as wrapped:
+            return wrapped
+
+
+def test_wrapped_429_is_retried_after_retry_after_ms():
+    # Without the header the backoff would be at least 5 seconds
+    scheduler = LLMScheduler(concurrency=1, backoff=10)
+    attempts = []
+
+    async def call():
+        attempts.append(time.perf_counter())
+        if len(attempts) == 1:
+            raise rate_limit_error({"retry-after-ms": "100"})
+        return "answer"
+
+    assert asyncio.run(scheduler.run(call, 1)) == "answer"
+    assert len(attempts) == 2
+    assert 0.1 <= attempts[1] - attempts[0] < 1
+    assert scheduler.paused_until > 0
+
+
+class FakeChatCompletion:
+    def __init__(self, tier: str, latency: float):
+        self.tier = tier
+        self.latency = latency
+
+    async def _inner_get_chat_message_contents(self, chat_history, settings):
+        await asyncio.sleep(self.latency)
+        return [self.tier]
+
+
+class FallbackChatCompletion(TierFallback, ScheduledChatCompletion, FakeChatCompletion):
+    def fallback_service(self, tier: str):
+        return FallbackChatCompletion(tier, 0.01)
+
+
+@pytest.fixture
+def one_slot_with_tier_timeout(monkeypatch):
+    monkeypatch.setattr(llm_scheduler, "llm_scheduler", LLMScheduler(concurrency=1))
+    monkeypatch.setattr(model_routing, "model_router", ModelRouter(
+        models={}, timeouts={"small": 0.3}, fallbacks={"small": "large"}))
+
+
+def answer_tiers(services) -> list[str]:
+    async def run():
+        results = await asyncio.gather(*(
+            service._inner_get_chat_message_contents(ChatHistory(), PromptExecutionSettings())
+            for service in services))
+        return [result[0] for result in results]
+    return asyncio.run(run())
+
+
+def test_time_queued_for_a_slot_does_not_trigger_the_tier_fallback(one_slot_with_tier_timeout):
+    # Each answers in 0.2s, within the 0.3s timeout, but the third waits 0.4s for the slot
+    services = [FallbackChatCompletion("small", 0.2) for _ in range(3)]
+    assert answer_tiers(services) == ["small", "small", "small"]
+
+
+def test_slow_answer_falls_back_to_the_next_tier(one_slot_with_tier_timeout):
+    assert answer_tiers([FallbackChatCompletion("small", 1)]) == ["large"]
@@ -0,0 +1,43 @@
+import ast
+import os
+
+SAMPLE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONCIERGE_DIR = os.path.normpath(os.path.join(SAMPLE_DIR, "..", "..", "..", "12 - Chainlit"))
+
+# Modules "12 - Chainlit" carries its own copy of, so each sample runs on its own.
+# The tests in this directory cover both copies only while they stay identical.
+SHARED_MODULES = (
+    "cache.py",
+    "history.py",
+    "llm_scheduler.py",
+    "model_routing.py",
+    "response_cache.py",
+    "session_state.py",
+    "streaming.py",
+    "telemetry.py",
+)
+
+
+def read(directory: str, name: str) -> str:
+    with open(os.path.join(directory, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def public_methods(source: str, class_name: str) -> dict[str, list[str]]:
+    """The argument names of a class's public methods."""
+    cls = next(node for node in ast.parse(source).body
+               if isinstance(node, ast.ClassDef) and node.name == class_name)
+    return {node.name: [arg.arg for arg in node.args.args]
+            for node in cls.body
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and not node.name.startswith("_")}
+
+
+def test_shared_modules_match_the_concierge_copies():
+    different = [name for name in SHARED_MODULES if read(SAMPLE_DIR, name) != read(CONCIERGE_DIR, name)]
+    assert not different, f"Copy the changes to both samples: {different}"
+
+
+def test_client_registries_have_the_same_api():
+    # clients.py differs by model provider (Azure OpenAI / GitHub Models), not by interface
+    assert (public_methods(read(SAMPLE_DIR, "clients.py"), "ClientRegistry")
+            == public_methods(read(CONCIERGE_DIR, "clients.py"), "ClientRegistry"))
@@ -0,0 +1,47 @@
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from streaming import TokenCoalescer  # noqa: E402
+
+
+class RecordingMessage:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.frames = []
+
+    async def stream_token(self, token: str) -> None:
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise ConnectionError("client went away")
+        self.frames.append(token)
+
+
+def test_tokens_are_batched_in_order():
+    message = RecordingMessage()
+
+    async def run():
+        async with TokenCoalescer(message, interval=0.01, max_bytes=16) as stream:
+            for i in range(100):
+                await stream.write(f"{i} ")
+
+    asyncio.run(run())
+    assert "".join(message.frames) == "".join(f"{i} " for i in range(100))
+    assert len(message.frames) < 100
+
+
+def test_writer_sees_the_sender_error_instead_of_hanging():
+    async def run():
+        async with TokenCoalescer(RecordingMessage(fail=True), interval=0.01, max_bytes=8, max_pending=32) as stream:
+            for _ in range(1000):
+                await stream.write("token ")
+
+    started = time.perf_counter()
+    with pytest.raises(ConnectionError):
+        asyncio.run(asyncio.wait_for(run(), timeout=5))
+    assert time.perf_counter() - started < 1
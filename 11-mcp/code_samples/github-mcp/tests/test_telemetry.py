@@ -0,0 +1,54 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from semantic_kernel import Kernel  # noqa: E402
+from semantic_kernel.functions import kernel_function  # noqa: E402
+
+from telemetry import MemorySink, Telemetry  # noqa: E402
+
+
+class EchoPlugin:
+    @kernel_function
+    def echo(self, text: str) -> str:
+        return text
+
+    @kernel_function
+    def fail(self) -> str:
+        raise ValueError("boom")
+
+
+def test_function_spans_are_recorded():
+    sink = MemorySink()
+    telemetry = Telemetry([sink])
+    kernel = Kernel()
+    kernel.add_plugin(EchoPlugin(), "Echo")
+    telemetry.install(kernel)
+    telemetry.install(kernel)  # Idempotent
+
+    result = asyncio.run(kernel.invoke(plugin_name="Echo", function_name="echo", text="hi"))
+    assert str(result) == "hi"
+    assert [span.name for span in sink.spans] == ["function"]
+    assert sink.spans[0].attributes == {"function": "Echo-echo"}
+    assert sink.spans[0].duration is not None
+
+    sink.clear()
+    try:
+        asyncio.run(kernel.invoke(plugin_name="Echo", function_name="fail"))
+    except Exception:
+        pass
+    assert sink.spans[0].attributes["function"] == "Echo-fail"
+    assert "error" in sink.spans[0].attributes
+
+
+def test_cloned_kernels_report_to_the_same_sinks():
+    sink = MemorySink()
+    telemetry = Telemetry([sink])
+    kernel = Kernel()
+    kernel.add_plugin(EchoPlugin(), "Echo")
+    telemetry.install(kernel)
+
+    asyncio.run(kernel.clone().invoke(plugin_name="Echo", function_name="echo", text="hi"))
+    assert [span.attributes["function"] for span in sink.spans] == ["Echo-echo"]
@@ -0,0 +1,69 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+
+REFRESH_SECONDS = float(os.getenv("MCP_TOOLS_REFRESH_SECONDS", "900"))
+
+
+def server_key(connection) -> str:
+    """Identifies an MCP server by transport and command/url. Hashed because the
+    command line can carry a personal access token."""
+    target = getattr(connection, "command", None) or getattr(connection, "url", None) or connection.name
+    identity = f"{getattr(connection, 'clientType', 'stdio')}:{target}"
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()[:16]
+
+
+def build_tools(listing) -> tuple[list[dict], str]:
+    """Converts a list_tools result once. Returns the tools and a version hash of the listing."""
+    tools = [{"name": t.name, "description": t.description, "input_schema": t.inputSchema}
+             for t in listing.tools]
+    version = hashlib.sha256("".join(
+        f"{t['name']}\0{t['description']}\0{json.dumps(t['input_schema'], sort_keys=True)}\n" for t in tools
+    ).encode("utf-8")).hexdigest()[:16]
+    return tools, version
+
+
+class ToolCatalog:
+    """Process-wide cache of MCP tool listings, keyed by server identity.
+
+    Sessions connecting to a known server get the cached listing immediately; once an
+    entry is older than `refresh_seconds` it is refreshed in the background and the
+    version changes only if the server's tools actually changed.
+    """
+
+    def __init__(self, refresh_seconds: float = REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._entries = {}  # key -> (fetched at, version, tools)
+        self._refreshing = set()
+
+    async def get_tools(self, key: str, session) -> list[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return await self._refresh(key, session)
+        fetched, _, tools = entry
+        if time.monotonic() - fetched > self.refresh_seconds and key not in self._refreshing:
+            self._refreshing.add(key)
+            asyncio.create_task(self._background_refresh(key, session))
+        return tools
+
+    async def _refresh(self, key: str, session) -> list[dict]:
+        tools, version = build_tools(await session.list_tools())
+        previous = self._entries.get(key)
+        if previous and previous[1] == version:
+            tools = previous[2]  # Keep the same objects so downstream caches stay valid
+        self._entries[key] = (time.monotonic(), version, tools)
+        return tools
+
+    async def _background_refresh(self, key: str, session) -> None:
+        try:
+            await self._refresh(key, session)
+        except Exception as e:
+            print(f"Warning: Failed to refresh MCP tool listing: {str(e)}")
+        finally:
+            self._refreshing.discard(key)
+
+
+tool_catalog = ToolCatalog()
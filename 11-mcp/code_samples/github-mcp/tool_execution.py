@@ -0,0 +1,38 @@
+import asyncio
+import os
+
+from semantic_kernel.filters import FilterTypes, FunctionInvocationContext
+from semantic_kernel.functions import FunctionResult
+
+
+TOOL_CONCURRENCY = int(os.getenv("TOOL_CONCURRENCY", "4"))
+TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", "30"))
+
+
+class ToolLimiter:
+    """Bounds how many tool calls one session runs at once and how long each may take."""
+
+    def __init__(self, concurrency: int = TOOL_CONCURRENCY, timeout: float = TOOL_TIMEOUT):
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(self, coro):
+        async with self._semaphore:
+            return await asyncio.wait_for(coro, timeout=self.timeout)
+
+    def install(self, kernel) -> None:
+        """Applies the limit and timeout to every function the kernel invokes.
+
+        Semantic Kernel already gathers the function calls of one model turn, so this
+        filter is what keeps that fan-out within the session's budget.
+        """
+
+        async def limit_tool_calls(context: FunctionInvocationContext, next):
+            try:
+                await self.run(next(context))
+            except asyncio.TimeoutError:
+                context.result = FunctionResult(
+                    function=context.function.metadata,
+                    value=f"Error: {context.function.fully_qualified_name} timed out after {self.timeout}s")
+
+        kernel.add_filter(FilterTypes.FUNCTION_INVOCATION, limit_tool_calls)
@@ -0,0 +1,76 @@
+import json
+import os
+
+from semantic_kernel.filters import FilterTypes, FunctionInvocationContext
+
+from cache import TTLCache
+from telemetry import annotate
+
+
+# Read-only tools of @modelcontextprotocol/server-github; anything else (create_*, update_*,
+# push_files, merge_pull_request, ...) always goes to the server
+READ_ONLY_GITHUB_TOOLS = (
+    "get_file_contents,get_issue,get_pull_request,get_pull_request_comments,get_pull_request_files,"
+    "get_pull_request_reviews,get_pull_request_status,list_commits,list_issues,list_pull_requests,"
+    "search_code,search_issues,search_repositories,search_users"
+)
+
+
+def canonical_arguments(arguments) -> str:
+    return json.dumps(dict(arguments or {}), sort_keys=True, separators=(",", ":"), default=str)
+
+
+class ToolResultCache:
+    """Memoizes results of idempotent MCP tools by (server, tool name, canonical arguments).
+
+    Only tools in `allowlist` are cached; every other tool bypasses the cache. Error
+    results are never stored. Entries are shared across sessions so popular accounts
+    are only fetched from GitHub once per TTL.
+    """
+
+    def __init__(self, allowlist: set[str], ttl: float = 300, max_size: int = 1024):
+        self.allowlist = allowlist
+        self.results = TTLCache(max_size=max_size, ttl=ttl)
+
+    def cacheable(self, tool_name: str) -> bool:
+        return tool_name in self.allowlist
+
+    async def call(self, server: str, tool_name: str, arguments, call):
+        """Returns the cached result for an allowlisted tool, or awaits `call()` and caches it."""
+        if not self.cacheable(tool_name):
+            return await call()
+        key = (server, tool_name, canonical_arguments(arguments))
+        result = self.results.get(key)
+        annotate(cache_hit=result is not None)
+        if result is None:
+            result = await call()
+            if not getattr(result, "isError", False):
+                self.results.set(key, result)
+        return result
+
+    def install(self, kernel, plugin_name: str = "Github") -> None:
+        """Serves allowlisted functions of `plugin_name` from the cache. Install it before
+        the ToolLimiter filter so cache hits don't wait for a concurrency slot."""
+
+        async def memoize_tool_calls(context: FunctionInvocationContext, next):
+            if context.function.plugin_name != plugin_name or not self.cacheable(context.function.name):
+                await next(context)
+                return
+            key = (plugin_name, context.function.name, canonical_arguments(context.arguments))
+            cached = self.results.get(key)
+            annotate(cache_hit=cached is not None)
+            if cached is not None:
+                context.result = cached
+                return
+            await next(context)
+            if context.result is not None and not getattr(context.result.value, "isError", False):
+                self.results.set(key, context.result)
+
+        kernel.add_filter(FilterTypes.FUNCTION_INVOCATION, memoize_tool_calls)
+
+
+tool_results = ToolResultCache(
+    allowlist={name.strip() for name in os.getenv("MCP_CACHE_TOOLS", READ_ONLY_GITHUB_TOOLS).split(",") if name.strip()},
+    ttl=float(os.getenv("MCP_CACHE_TTL", "300")),
+    max_size=int(os.getenv("MCP_CACHE_SIZE", "1024")),
+)
@@ -0,0 +1,40 @@
+class ToolRouter:
+    """Maps each MCP tool name to the connection that serves it.
+
+    The index is updated as connections come and go, so routing a tool call is a
+    single dict lookup. When two connections expose the same tool name the first
+    one keeps the route; the other takes over if the first disconnects.
+    """
+
+    def __init__(self):
+        self.tools = {}    # connection name -> list of tool dicts
+        self.routes = {}   # tool name -> connection name
+        self.servers = {}  # connection name -> server identity (see tool_catalog.server_key)
+
+    def add_connection(self, connection_name: str, tools: list[dict], server: str | None = None) -> list[str]:
+        """Indexes the tools of a connection. Returns the names that conflict with another connection."""
+        self.remove_connection(connection_name)
+        self.tools[connection_name] = tools
+        self.servers[connection_name] = server or connection_name
+        conflicts = []
+        for tool in tools:
+            owner = self.routes.setdefault(tool["name"], connection_name)
+            if owner != connection_name:
+                conflicts.append(tool["name"])
+        return conflicts
+
+    def remove_connection(self, connection_name: str) -> None:
+        removed = self.tools.pop(connection_name, [])
+        self.servers.pop(connection_name, None)
+        for tool in removed:
+            if self.routes.get(tool["name"]) != connection_name:
+                continue
+            del self.routes[tool["name"]]
+            # Hand the route to another connection exposing the same tool, if any
+            for other_name, other_tools in self.tools.items():
+                if any(t["name"] == tool["name"] for t in other_tools):
+                    self.routes[tool["name"]] = other_name
+                    break
+
+    def route(self, tool_name: str) -> str | None:
+        return self.routes.get(tool_name)
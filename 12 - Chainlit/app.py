@@ -28,7 +28,19 @@ from semantic_kernel.kernel import Kernel
 from semantic_kernel.connectors.ai.open_ai import OpenAIChatCompletion
 from semantic_kernel.contents import AuthorRole, ChatMessageContent
 from semantic_kernel.functions import KernelFunctionFromPrompt
+
+# Load environment variables (before the local modules, which read their settings on import)
+load_dotenv()
+
+from clients import clients
+from model_routing import model_router
 from group import create_hotel_concierge_group_chat
+from history import HistoryManager, reduce_group_chat
+from llm_scheduler import request_context
+from response_cache import conversation_context, response_cache
+from session_state import SessionManager, create_session_store, dump_messages, load_messages
+from streaming import TokenCoalescer
+from telemetry import telemetry
 
 
 
@@ -48,22 +60,14 @@ class WeatherPlugin:
         else:
             return f"Sorry, I don't have the weather for {city}."
 
-@cl.on_chat_start
-async def on_chat_start():
-
-    load_dotenv()
+async def build_session(state: dict | None) -> dict:
+    """Creates a session's kernel, agents and histories, restoring a stored state if there is one."""
     # Setup Semantic Kernel
     kernel = sk.Kernel()
-    client = AsyncOpenAI(
-    api_key=os.environ.get("GITHUB_TOKEN"), 
-    base_url="https://models.inference.ai.azure.com/",
-    )   
-
-    # Create an AI Service that will be used by the `ChatCompletionAgent`
-    chat_completion_service = OpenAIChatCompletion(
-        ai_model_id="gpt-4o-mini",
-        async_client=client,
-    )
+
+    # Create an AI Service that will be used by the `ChatCompletionAgent`.
+    # It is shared by all sessions, along with its HTTP connection pool.
+    chat_completion_service = clients.chat_completion(tier=model_router.tier_for("chat", "large"))
     # Add your AI service (e.g., OpenAI)
     # Make sure OPENAI_API_KEY and OPENAI_ORG_ID are set in your environment
     ai_service = chat_completion_service
@@ -71,6 +75,9 @@ async def on_chat_start():
 
     # Import the WeatherPlugin
     kernel.add_plugin(WeatherPlugin(), plugin_name="Weather")
+
+    # One span per function call (get_weather and the selection/termination prompts) on this kernel
+    telemetry.install(kernel)
     
     # Set up the agent group chat
     group_chat, front_desk_name, concierge_name = create_hotel_concierge_group_chat(kernel)
@@ -79,14 +86,50 @@ async def on_chat_start():
     # This will automatically capture function calls as Steps
     # sk_filter = cl.SemanticKernelFilter(kernel=kernel)
 
-    # Store everything in the session
-    cl.user_session.set("kernel", kernel)
-    cl.user_session.set("ai_service", ai_service)
-    cl.user_session.set("chat_history", ChatHistory())
-    cl.user_session.set("group_chat", group_chat)
-    cl.user_session.set("front_desk_name", front_desk_name)
-    cl.user_session.set("concierge_name", concierge_name)
-    
+    chat_history = ChatHistory()
+    if state:
+        chat_history.messages.extend(load_messages(state.get("history")))
+        group_chat.history.messages.extend(load_messages(state.get("group")))
+        # The group history may have been summarized past the weather agent's reply
+        group_chat.selection_strategy.weather_spoken = state.get("weather_spoken", False)
+
+    return {
+        "kernel": kernel,
+        "ai_service": ai_service,
+        "chat_history": chat_history,
+        # History summaries are a control-plane call, answered by the small model tier
+        "history_manager": HistoryManager(clients.chat_completion(tier=model_router.tier_for("summary", "small"))),
+        "group_chat": group_chat,
+        "front_desk_name": front_desk_name,
+        "concierge_name": concierge_name,
+    }
+
+
+def snapshot_session(objects: dict) -> dict:
+    """The part of a session that can't be rebuilt: its histories."""
+    return {
+        "history": dump_messages(objects["chat_history"].messages),
+        "group": dump_messages(objects["group_chat"].history.messages),
+        "weather_spoken": objects["group_chat"].selection_strategy.weather_spoken,
+    }
+
+
+# Live session objects are rebuilt from the session store (SESSION_STORE) on demand
+# and evicted from memory when idle, so any worker can serve any session
+sessions = SessionManager(build_session, snapshot_session, store=create_session_store())
+
+
+def session_key() -> str:
+    # The thread id survives reconnects and resumes, the websocket session id does not
+    return cl.context.session.thread_id or cl.context.session.id
+
+
+@cl.on_chat_start
+async def on_chat_start():
+
+    load_dotenv()
+    # Build the session's kernel, agents and histories (restored if the store has them)
+    await sessions.start(session_key())
     
     # Welcome message
     await cl.Message(
@@ -94,36 +137,67 @@ async def on_chat_start():
         author="System"
     ).send()
 
+
+@cl.on_chat_resume
+async def on_chat_resume(thread):
+    # A resumed thread may land on any worker; its state comes back from the session store
+    await sessions.start(session_key())
+
+
+@cl.on_chat_end
+async def on_chat_end():
+    # The stored state outlives the session (for resumes) until SESSION_STATE_TTL
+    await sessions.end(session_key())
+
+
+# Close the shared clients when the app stops (Chainlit versions with app hooks)
+if hasattr(cl, "on_app_shutdown"):
+    @cl.on_app_shutdown
+    async def on_app_shutdown():
+        await sessions.close()
+        await clients.close()
+
+
 @cl.on_message
+@telemetry.traced("turn")
 async def on_message(message: cl.Message):
-    kernel = cl.user_session.get("kernel")
-    ai_service = cl.user_session.get("ai_service")
-    chat_history = cl.user_session.get("chat_history")
-    
-    # Get the group chat setup
-    group_chat = cl.user_session.get("group_chat")
-    front_desk_name = cl.user_session.get("front_desk_name")
-    concierge_name = cl.user_session.get("concierge_name")
-    
-    # Use group chat for recommendations
-    await handle_group_chat(message, group_chat, front_desk_name, concierge_name)
+    # Model requests of this turn are queued fairly against other sessions
+    with request_context(session=session_key()):
+        async with sessions.use(session_key()) as objects:
+            kernel = objects["kernel"]
+            ai_service = objects["ai_service"]
+            chat_history = objects["chat_history"]
+
+            # Get the group chat setup
+            group_chat = objects["group_chat"]
+            front_desk_name = objects["front_desk_name"]
+            concierge_name = objects["concierge_name"]
+            history_manager = objects["history_manager"]
+
+            # Use group chat for recommendations
+            await handle_group_chat(message, group_chat, front_desk_name, concierge_name, history_manager)
 
 
-async def handle_regular_chat(message: cl.Message, kernel: sk.Kernel, ai_service, chat_history: ChatHistory):
-    # Add user message to history
+async def handle_regular_chat(message: cl.Message, kernel: sk.Kernel, ai_service, chat_history: ChatHistory,
+                              history_manager: HistoryManager = None):
+    # Add user message to history and trim older turns to the token budget
     chat_history.add_user_message(message.content)
+    if history_manager:
+        await history_manager.reduce(chat_history)
 
     # Create a Chainlit message for the response stream
     answer = cl.Message(content="")
 
-    async for msg in ai_service.get_streaming_chat_message_content(
-        chat_history=chat_history,
-        user_input=message.content,
-        settings=request_settings,
-        kernel=kernel,
-    ):
-        if msg.content:
-            await answer.stream_token(msg.content)
+    # Tokens are batched into fewer websocket frames
+    async with TokenCoalescer(answer) as stream:
+        async for msg in ai_service.get_streaming_chat_message_content(
+            chat_history=chat_history,
+            user_input=message.content,
+            settings=request_settings,
+            kernel=kernel,
+        ):
+            if msg.content:
+                await stream.write(msg.content)
 
     # Add the full assistant response to history
     chat_history.add_assistant_message(answer.content)
@@ -131,27 +205,53 @@ async def handle_regular_chat(message: cl.Message, kernel: sk.Kernel, ai_service
     # Send the final message
     await answer.send()
 
-async def handle_group_chat(message: cl.Message, group_chat, front_desk_name: str, concierge_name: str):
+async def handle_group_chat(message: cl.Message, group_chat, front_desk_name: str, concierge_name: str,
+                            history_manager: HistoryManager = None):
+    # Opt-in response cache (flow name "concierge"). The weather tool's output only
+    # depends on the city in the prompt, so the key is the normalized prompt plus the
+    # conversation before it; a follow-up never reuses another session's answer.
+    cache_key = None
+    if response_cache.enabled_for("concierge"):
+        cache_key = response_cache.make_key(
+            "concierge", message.content, conversation_context(group_chat.history.messages))
+
     # Send user message with user's avatar
     await message.send()
     await group_chat.add_chat_message(ChatMessageContent(role=AuthorRole.USER, content=message.content))
     # Process the message through the group chat
     # result = await group_chat.send_async(message.content)
-    
-    # Track which agent messages we've already displayed
-    displayed_messages = set()
-    
-    # Display the conversation between agents
-    async for content in group_chat.invoke():
-        # Skip user message and messages we've already displayed
-        message = f"## Agent - {content.name or '*'}: \n '{content.content}'"
-           
-        # Add this message to displayed set
-        displayed_messages.add(message)
-        
-        # Determine the correct author name based on agent name
-     
-        
-        # Create and send the agent message
-        agent_msg = cl.Message(content=message, author=content.name )
-        await agent_msg.send()
\ No newline at end of file
+
+    if cache_key is not None:
+        cached_responses = await response_cache.get(cache_key)
+        if cached_responses is not None:
+            for agent_name, response in cached_responses:
+                await group_chat.add_chat_message(
+                    ChatMessageContent(role=AuthorRole.ASSISTANT, name=agent_name, content=response))
+                await cl.Message(content=f"## Agent - {agent_name}: \n{response}", author=agent_name).send()
+            return
+
+    # Stream each agent's reply into its own message as the tokens arrive,
+    # batched into fewer websocket frames
+    agent_responses = []
+    responses = group_chat.invoke_stream()
+    content = await anext(responses, None)
+    while content is not None:
+        agent_name = content.name or "*"
+        agent_msg = cl.Message(content=f"## Agent - {agent_name}: \n", author=agent_name)
+        await agent_msg.send()
+        agent_responses.append([agent_name, ""])
+        # The sender task is closed even if the model stream fails mid-reply
+        async with TokenCoalescer(agent_msg) as stream:
+            while content is not None and (content.name or agent_name) == agent_name:
+                if content.content:
+                    agent_responses[-1][1] += content.content
+                    await stream.write(content.content)
+                content = await anext(responses, None)
+        await agent_msg.update()
+
+    if cache_key is not None and agent_responses:
+        await response_cache.set(cache_key, agent_responses)
+
+    # Keep the group chat's history (re-sent on every agent turn) within the token budget
+    if history_manager:
+        await reduce_group_chat(history_manager, group_chat)
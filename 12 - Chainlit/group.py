@@ -1,18 +1,28 @@
 import os
+import re
 
 from openai import AsyncOpenAI
 
-from semantic_kernel.agents import ChatCompletionAgent, AgentGroupChat
+from semantic_kernel.agents import ChatCompletionAgent
 from semantic_kernel.agents.strategies import (
     KernelFunctionSelectionStrategy,
     KernelFunctionTerminationStrategy,
 )
+# Not exported from semantic_kernel.agents.strategies by every Semantic Kernel version
+from semantic_kernel.agents.strategies.selection.selection_strategy import SelectionStrategy
+from semantic_kernel.agents.strategies.termination.termination_strategy import TerminationStrategy
+from pydantic import Field
 from semantic_kernel.functions import kernel_function
 from semantic_kernel.kernel import Kernel
 from semantic_kernel.connectors.ai.open_ai import OpenAIChatCompletion
 from semantic_kernel.contents import AuthorRole, ChatMessageContent
 from semantic_kernel.functions import KernelFunctionFromPrompt
+from semantic_kernel.prompt_template import InputVariable, PromptTemplateConfig
 
+from clients import clients
+from model_routing import model_router
+from streaming import StreamingAgentGroupChat
+from telemetry import annotate, telemetry
 
 
 class WeatherPlugin:
@@ -28,12 +38,129 @@ class WeatherPlugin:
         else:
             return f"The weather in {city} is 30°C and cloudy."
         
-def _create_kernel_with_chat_completion():
-    """Create a kernel with chat completion service."""
-    # This function should be implemented based on your configuration
-    # Similar to how it's done in app.py
-    kernel = sk.Kernel()
-    return kernel
+class ConciergeSelectionStrategy(SelectionStrategy):
+    """Picks the next speaker from the fixed turn order, without an LLM call.
+
+    user -> WeatherConditionsAgent (only once per conversation) -> FrontDesk -> Concierge -> FrontDesk...
+    The `fallback` strategy is only used when the last speaker is not one of the known
+    participants, so the order can't be decided from the rules.
+    `weather_spoken` is kept here rather than read from the history alone, because
+    reduce_group_chat may fold the weather reply into a summary.
+    """
+
+    weather_name: str
+    front_desk_name: str
+    reviewer_name: str
+    fallback: SelectionStrategy | None = None
+    weather_spoken: bool = False
+
+    async def select_agent(self, agents, history):
+        # next() in the base class still applies initial_agent before calling this
+        with telemetry.span("selection", strategy="concierge") as span:
+            agent = await self._select_agent(agents, history)
+            span.attributes["agent"] = agent.name
+            return agent
+
+    async def _select_agent(self, agents, history):
+        agents_by_name = {agent.name: agent for agent in agents}
+        self.weather_spoken = self.weather_spoken or any(message.name == self.weather_name for message in history)
+
+        last = next((message for message in reversed(history) if message.role != AuthorRole.TOOL), None)
+        if last is None or last.role == AuthorRole.USER:
+            next_name = self.front_desk_name if self.weather_spoken else self.weather_name
+        elif last.name == self.weather_name:
+            next_name = self.front_desk_name
+        elif last.name == self.front_desk_name:
+            next_name = self.reviewer_name
+        elif last.name == self.reviewer_name:
+            next_name = self.front_desk_name
+        elif self.fallback is not None:
+            annotate(fallback=True)
+            return await self.fallback.next(agents, history)
+        else:
+            next_name = self.front_desk_name
+
+        if next_name not in agents_by_name:
+            next_name = self.front_desk_name
+        self.weather_spoken = self.weather_spoken or next_name == self.weather_name
+        return agents_by_name[next_name]
+
+
+APPROVAL_PATTERN = re.compile(
+    r"\b(approved?|approving|meets the goal|perfect (choice|recommendation))\b", re.IGNORECASE)
+NEGATED_APPROVAL_PATTERN = re.compile(
+    r"\b(not|cannot|can't|don't|won't|isn't)\s+(yet\s+)?(be\s+)?approved?\b", re.IGNORECASE)
+REFINEMENT_PATTERN = re.compile(
+    r"\b(refine|reconsider|instead|however|could be improved|consider)\b", re.IGNORECASE)
+# "I would approve this if...": an approval word with a condition in the same sentence
+CONDITIONAL_APPROVAL_PATTERN = re.compile(
+    r"\b(would|could|might|if|once|after|when|unless)\b[^.!?]*\bapprov"
+    r"|\bapprov\w*\b[^.!?]*\b(would|could|if|once|after|when|unless)\b", re.IGNORECASE)
+
+
+def classify_approval(text: str) -> bool | None:
+    """Returns True/False when the reviewer's reply is clearly an approval/refinement, None if unsure."""
+    refinements = len(NEGATED_APPROVAL_PATTERN.findall(text)) + len(REFINEMENT_PATTERN.findall(text))
+    approvals = len(APPROVAL_PATTERN.findall(NEGATED_APPROVAL_PATTERN.sub("", text)))
+    if approvals and not refinements:
+        return None if CONDITIONAL_APPROVAL_PATTERN.search(text) else True
+    if refinements and not approvals:
+        return False
+    return None
+
+
+class ConciergeTerminationStrategy(TerminationStrategy):
+    """Ends the chat once the Concierge approves, deciding locally when it can.
+
+    The last Concierge message is checked with `classify_approval`; only when that is
+    inconclusive is the `fallback` strategy asked, with just the last `window` messages.
+    `decisions` counts which path decided, and `last_decision` names the latest one.
+    """
+
+    reviewer_name: str
+    fallback: TerminationStrategy | None = None
+    window: int = 4
+    decisions: dict[str, int] = Field(default_factory=lambda: {"local": 0, "llm": 0})
+    last_decision: str | None = None
+
+    async def should_agent_terminate(self, agent, history):
+        with telemetry.span("termination", strategy="concierge", agent=agent.name) as span:
+            terminate = await self._should_agent_terminate(agent, history)
+            span.attributes.update(decision=self.last_decision, terminate=terminate)
+            return terminate
+
+    async def _should_agent_terminate(self, agent, history):
+        last = next((message for message in reversed(history)
+                     if message.name == self.reviewer_name and message.content), None)
+        verdict = classify_approval(last.content) if last else False
+        if verdict is not None or self.fallback is None:
+            self.last_decision = "local"
+            self.decisions["local"] += 1
+            return bool(verdict)
+
+        self.last_decision = "llm"
+        self.decisions["llm"] += 1
+        return await self.fallback.should_agent_terminate(agent, history[-self.window:])
+
+
+def _create_kernel_with_chat_completion(kernel: Kernel, name: str, default_tier: str) -> Kernel:
+    """Create a copy of the session kernel (plugins and filters) whose only chat completion
+    service is the model tier routed to `name`."""
+    tier_kernel = kernel.clone()
+    tier_kernel.remove_all_services()
+    tier_kernel.add_service(clients.chat_completion(tier=model_router.tier_for(name, default_tier)))
+    return tier_kernel
+
+def _create_strategy_function(function_name: str, prompt: str) -> KernelFunctionFromPrompt:
+    """Create a prompt function for the LLM selection/termination strategies. They pass the
+    history as a list of message dicts, which the template only renders unescaped."""
+    return KernelFunctionFromPrompt(
+        function_name=function_name,
+        prompt_template_config=PromptTemplateConfig(
+            template=prompt,
+            input_variables=[InputVariable(name="history", allow_dangerously_set_content=True)],
+        ),
+    )
 
 def create_hotel_concierge_group_chat(kernel):
     """Create a hotel concierge group chat with a front desk agent and a reviewer."""
@@ -45,7 +172,7 @@ def create_hotel_concierge_group_chat(kernel):
     If not, provide insight on how to refine the recommendation without using a specific example. 
     """
     agent_reviewer = ChatCompletionAgent(
-        kernel=kernel,
+        kernel=_create_kernel_with_chat_completion(kernel, REVIEWER_NAME, "large"),
         name=REVIEWER_NAME,
         instructions=REVIEWER_INSTRUCTIONS,
     )
@@ -60,7 +187,7 @@ def create_hotel_concierge_group_chat(kernel):
     Consider suggestions when refining an idea.
     """
     agent_writer = ChatCompletionAgent(
-        kernel=kernel,
+        kernel=_create_kernel_with_chat_completion(kernel, FRONTDESK_NAME, "large"),
         name=FRONTDESK_NAME,
         instructions=FRONTDESK_INSTRUCTIONS,
     )
@@ -74,14 +201,15 @@ def create_hotel_concierge_group_chat(kernel):
     Don't waste time with chit chat.
     Consider suggestions when refining an idea.
     """
+    # Only relays the weather tool's answer, so the small model is enough
     agent_weather = ChatCompletionAgent(
-        kernel=kernel,
+        kernel=_create_kernel_with_chat_completion(kernel, WEATHER_NAME, "small"),
         name=WEATHER_NAME,
         instructions=WEATHER_INSTRUCTIONS,
         plugins=[WeatherPlugin()],
     )
 
-    termination_function = KernelFunctionFromPrompt(
+    termination_function = _create_strategy_function(
         function_name="termination",
         prompt="""
         Determine if the recommendation process is complete.
@@ -97,7 +225,7 @@ def create_hotel_concierge_group_chat(kernel):
         """,
     )
 
-    selection_function = KernelFunctionFromPrompt(
+    selection_function = _create_strategy_function(
         function_name="selection",
         prompt=f"""
         Determine which participant takes the next turn in a conversation based on the the most recent participant.
@@ -123,23 +251,36 @@ def create_hotel_concierge_group_chat(kernel):
         """,
     )
 
-    chat = AgentGroupChat(
+    # Records the replies streamed by invoke_stream() in the shared history
+    chat = StreamingAgentGroupChat(
         agents=[agent_writer, agent_reviewer,agent_weather],
-        termination_strategy=KernelFunctionTerminationStrategy(
+        # Approval is usually obvious from the wording; the LLM only sees a short window when it isn't
+        termination_strategy=ConciergeTerminationStrategy(
             agents=[agent_reviewer],
-            function=termination_function,
-            kernel=kernel,
-            result_parser=lambda result: str(result.value[0]).lower() == "yes",
-            history_variable_name="history",
+            reviewer_name=REVIEWER_NAME,
             maximum_iterations=10,
+            fallback=KernelFunctionTerminationStrategy(
+                agents=[agent_reviewer],
+                function=termination_function,
+                kernel=_create_kernel_with_chat_completion(kernel, "termination", "small"),
+                result_parser=lambda result: str(result.value[0]).lower() == "yes",
+                history_variable_name="history",
+                maximum_iterations=10,
+            ),
         ),
-        selection_strategy=KernelFunctionSelectionStrategy(
-            function=selection_function,
-            kernel=kernel,
-            result_parser=lambda result: str(
-                result.value[0]) if result.value is not None else FRONTDESK_NAME,
-            agent_variable_name="agents",
-            history_variable_name="history",
+        # The turn order is deterministic, so the LLM selection prompt is only a fallback
+        selection_strategy=ConciergeSelectionStrategy(
+            weather_name=WEATHER_NAME,
+            front_desk_name=FRONTDESK_NAME,
+            reviewer_name=REVIEWER_NAME,
+            fallback=KernelFunctionSelectionStrategy(
+                function=selection_function,
+                kernel=_create_kernel_with_chat_completion(kernel, "selection", "small"),
+                result_parser=lambda result: str(
+                    result.value[0]) if result.value is not None else FRONTDESK_NAME,
+                agent_variable_name="agents",
+                history_variable_name="history",
+            ),
         ),
     )
     
@@ -0,0 +1,304 @@
+import asyncio
+import os
+import random
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+
+import openai
+
+from telemetry import annotate
+
+
+INTERACTIVE = 0  # A user is waiting for the answer
+BACKGROUND = 1   # Housekeeping such as history summaries
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_SECONDS = float(os.getenv("LLM_BACKOFF_SECONDS", "1"))
+LLM_MAX_BACKOFF_SECONDS = float(os.getenv("LLM_MAX_BACKOFF_SECONDS", "60"))
+LLM_COMPLETION_TOKENS = int(os.getenv("LLM_COMPLETION_TOKENS", "512"))  # Estimate before the usage is known
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+_session: ContextVar[str] = ContextVar("llm_session", default="default")
+_priority: ContextVar[int] = ContextVar("llm_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def request_context(session: str | None = None, priority: int | None = None):
+    """Tags the model requests made inside the block with a session and a priority."""
+    tokens = []
+    if session is not None:
+        tokens.append((_session, _session.set(session)))
+    if priority is not None:
+        tokens.append((_priority, _priority.set(priority)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+class TokenBucket:
+    """Allows `per_minute` units per minute, in bursts of up to a minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float) -> None:
+        amount = min(amount, self.capacity)
+        async with self._lock:  # Waiters are served in order
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def adjust(self, amount: float) -> None:
+        """Charges (or refunds, when negative) the difference between an estimate and the actual use."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+
+def retry_after(error: BaseException) -> float | None:
+    """Seconds from the Retry-After(-ms) header of an OpenAI error, or its cause's."""
+    api_error = find_api_error(error)
+    response = getattr(api_error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:  # An HTTP date; fall back to exponential backoff
+        return None
+    return None
+
+
+def bounded(awaitable, timeout: float | None):
+    """`awaitable`, failing with TimeoutError after `timeout` seconds when one is given."""
+    return asyncio.wait_for(awaitable, timeout) if timeout is not None else awaitable
+
+
+def find_api_error(error: BaseException | None) -> openai.APIError | None:
+    # Semantic Kernel wraps OpenAI errors in its own exceptions
+    while error is not None:
+        if isinstance(error, openai.APIError):
+            return error
+        error = error.__cause__ or error.__context__
+    return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    api_error = find_api_error(error)
+    if isinstance(api_error, openai.APIConnectionError):
+        return True
+    return getattr(api_error, "status_code", None) in RETRYABLE_STATUS
+
+
+class LLMScheduler:
+    """Process-wide gate for model requests.
+
+    At most `concurrency` requests run at once. Waiting requests are served by priority
+    (interactive before background), then round-robin across sessions, so one busy
+    session can't starve the others. Requests and tokens per minute are held under the
+    provider quota with token buckets; 429s and transient errors are retried with
+    exponential backoff, and a Retry-After header pauses every request until it passes.
+    """
+
+    def __init__(self, concurrency: int = LLM_MAX_CONCURRENCY,
+                 requests_per_minute: float = LLM_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = LLM_TOKENS_PER_MINUTE,
+                 max_retries: int = LLM_MAX_RETRIES, backoff: float = LLM_BACKOFF_SECONDS,
+                 max_backoff: float = LLM_MAX_BACKOFF_SECONDS):
+        self.available = max(1, concurrency)
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.paused_until = 0.0
+        self._queues = {INTERACTIVE: OrderedDict(), BACKGROUND: OrderedDict()}  # priority -> session -> waiters
+
+    def _queued(self) -> bool:
+        return any(self._queues.values())
+
+    def _next_waiter(self):
+        for priority in sorted(self._queues):
+            sessions = self._queues[priority]
+            while sessions:
+                session, waiters = next(iter(sessions.items()))
+                waiter = waiters.popleft()
+                if waiters:
+                    sessions.move_to_end(session)
+                else:
+                    del sessions[session]
+                if not waiter.done():
+                    return waiter
+        return None
+
+    async def _acquire(self) -> None:
+        if self.available > 0 and not self._queued():
+            self.available -= 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        sessions = self._queues[_priority.get()]
+        session = _session.get()
+        sessions.setdefault(session, deque()).append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release()  # The slot was handed over just as we were cancelled
+            elif waiter in sessions.get(session, ()):
+                sessions[session].remove(waiter)
+                if not sessions[session]:
+                    del sessions[session]
+            raise
+
+    def _release(self) -> None:
+        waiter = self._next_waiter()
+        if waiter is not None:
+            waiter.set_result(None)  # Hand the slot straight to the next request
+        else:
+            self.available += 1
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int):
+        """Waits for a concurrency slot and the rate limits, holding the slot for the block."""
+        queued = time.perf_counter()
+        await self._acquire()
+        try:
+            pause = self.paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            if self.requests is not None:
+                await self.requests.acquire(1)
+            if self.tokens is not None:
+                await self.tokens.acquire(estimated_tokens)
+            annotate(queued_ms=round((time.perf_counter() - queued) * 1000, 1))
+            yield
+        finally:
+            self._release()
+
+    def record_tokens(self, estimated: int, actual: int | None) -> None:
+        if self.tokens is not None and actual is not None:
+            self.tokens.adjust(actual - estimated)
+
+    def _retry_delay(self, error: BaseException, attempt: int) -> float | None:
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+        delay = retry_after(error)
+        if delay is not None:
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+            return delay
+        return min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+    async def run(self, call, estimated_tokens: int, timeout: float | None = None):
+        """Awaits `call()` under the scheduler, retrying transient failures. `timeout` bounds
+        each attempt from the moment it holds a slot, so time spent queued doesn't count."""
+        attempt = 0
+        while True:
+            async with self.slot(estimated_tokens):
+                try:
+                    return await bounded(call(), timeout)
+                except Exception as e:
+                    delay = self._retry_delay(e, attempt)
+                    if delay is None:
+                        raise
+            annotate(retries=attempt + 1)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def stream(self, make_stream, estimated_tokens: int, timeout: float | None = None):
+        """Iterates `make_stream()` under the scheduler. Failures are only retried before
+        the first chunk; after that the caller has already shown part of the answer.
+        `timeout` bounds the wait for the first chunk once the request holds a slot."""
+        attempt = 0
+        while True:
+            async with self.slot(estimated_tokens):
+                started = False
+                stream = make_stream()
+                try:
+                    try:
+                        item = await bounded(anext(stream), timeout)
+                    except StopAsyncIteration:
+                        return
+                    started = True
+                    yield item
+                    async for item in stream:
+                        yield item
+                    return
+                except Exception as e:
+                    delay = None if started else self._retry_delay(e, attempt)
+                    if delay is None:
+                        raise
+                finally:
+                    await stream.aclose()
+            annotate(retries=attempt + 1)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+llm_scheduler = LLMScheduler()
+
+
+def estimate_tokens(chat_history, settings) -> int:
+    """A rough request size for the tokens-per-minute bucket (~4 characters per token)."""
+    prompt = sum(len(str(message.content or "")) for message in chat_history.messages) // 4
+    completion = getattr(settings, "max_completion_tokens", None) or getattr(settings, "max_tokens", None)
+    return prompt + (completion or LLM_COMPLETION_TOKENS)
+
+
+def usage_tokens(messages) -> int | None:
+    for message in messages or []:
+        usage = (getattr(message, "metadata", None) or {}).get("usage")
+        if usage is not None:
+            return (getattr(usage, "prompt_tokens", 0) or 0) + (getattr(usage, "completion_tokens", 0) or 0)
+    return None
+
+
+class ScheduledChatCompletion:
+    """Mixin for Semantic Kernel chat completion services that sends every request
+    through the process-wide `llm_scheduler`."""
+
+    def _response_timeout(self) -> float | None:
+        """Seconds a request may take to answer (or start streaming) once it holds a
+        scheduler slot; None waits as long as the client does. Mixins may override it."""
+        return None
+
+    async def _inner_get_chat_message_contents(self, chat_history, settings, *args, **kwargs):
+        estimated = estimate_tokens(chat_history, settings)
+        messages = await llm_scheduler.run(
+            lambda: super(ScheduledChatCompletion, self)._inner_get_chat_message_contents(
+                chat_history, settings, *args, **kwargs),
+            estimated, self._response_timeout())
+        llm_scheduler.record_tokens(estimated, usage_tokens(messages))
+        return messages
+
+    async def _inner_get_streaming_chat_message_contents(self, chat_history, settings, *args, **kwargs):
+        estimated = estimate_tokens(chat_history, settings)
+        actual = None
+        async for messages in llm_scheduler.stream(
+                lambda: super(ScheduledChatCompletion, self)._inner_get_streaming_chat_message_contents(
+                    chat_history, settings, *args, **kwargs),
+                estimated, self._response_timeout()):
+            actual = usage_tokens(messages) or actual
+            yield messages
+        llm_scheduler.record_tokens(estimated, actual)
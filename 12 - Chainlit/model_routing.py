@@ -0,0 +1,151 @@
+import asyncio
+import os
+from contextvars import ContextVar
+
+from telemetry import annotate
+
+
+TIERS = ("small", "large")
+
+_in_fallback: ContextVar[bool] = ContextVar("in_fallback", default=False)
+
+
+def _reset_fallback(token) -> None:
+    try:
+        _in_fallback.reset(token)
+    except ValueError:  # Closed from another context (e.g. an abandoned stream)
+        pass
+
+
+def parse_pairs(value: str) -> dict[str, str]:
+    """Parses "a=b,c=d" into {"a": "b", "c": "d"}."""
+    pairs = {}
+    for item in value.split(","):
+        if "=" in item:
+            key, _, val = item.partition("=")
+            pairs[key.strip()] = val.strip()
+    return pairs
+
+
+class ModelRouter:
+    """Maps agents and strategy functions to model tiers, and tiers to models.
+
+    Each caller declares a default tier ("small" for short control-plane calls such as
+    selection and termination, "large" for the agents that write the answers); `routes`
+    overrides it by name. A tier with a timeout falls back to its `fallbacks` tier when
+    the model doesn't answer (or start streaming) in time.
+    """
+
+    def __init__(self, models: dict[str, str | None], routes: dict[str, str] | None = None,
+                 timeouts: dict[str, float] | None = None, fallbacks: dict[str, str] | None = None):
+        self.models = models
+        self.routes = routes or {}
+        self.timeouts = timeouts or {}
+        self.fallbacks = fallbacks or {}
+        unknown = {tier for tier in list(self.routes.values()) + list(self.fallbacks.values()) if tier not in TIERS}
+        if unknown:
+            raise ValueError(f"Unknown model tiers {sorted(unknown)}, expected one of {list(TIERS)}")
+
+    def tier_for(self, name: str, default: str) -> str:
+        return self.routes.get(name, default)
+
+    def model(self, tier: str) -> str | None:
+        """The model (or Azure deployment) for a tier; None means the app's default model."""
+        return self.models.get(tier)
+
+    def timeout(self, tier: str) -> float | None:
+        return self.timeouts.get(tier)
+
+    def fallback(self, tier: str) -> str | None:
+        return self.fallbacks.get(tier)
+
+
+def create_model_router() -> ModelRouter:
+    """Configured from the environment:
+
+    MODEL_SMALL / MODEL_LARGE    model or deployment per tier (default: the app's model)
+    MODEL_ROUTES                 per-name overrides, e.g. "HackathonAgent=small,selection=large"
+    MODEL_TIMEOUT_SMALL / _LARGE seconds before falling back (default: no timeout)
+    MODEL_FALLBACK               fallback tier per tier (default "small=large")
+    """
+    timeouts = {}
+    for tier in TIERS:
+        value = os.getenv(f"MODEL_TIMEOUT_{tier.upper()}")
+        if value:
+            timeouts[tier] = float(value)
+    return ModelRouter(
+        models={tier: os.getenv(f"MODEL_{tier.upper()}") or None for tier in TIERS},
+        routes=parse_pairs(os.getenv("MODEL_ROUTES", "")),
+        timeouts=timeouts,
+        fallbacks=parse_pairs(os.getenv("MODEL_FALLBACK", "small=large")),
+    )
+
+
+model_router = create_model_router()
+
+
+class TierFallback:
+    """Mixin for chat completion services that declare a `tier` field and implement
+    `fallback_service(tier)`. A request that gets no response (or first streamed chunk)
+    within the tier's timeout is sent again to the fallback tier's service.
+
+    The timeout is applied by ScheduledChatCompletion (listed after this mixin) through
+    `_response_timeout()`, so it only starts once the request leaves the scheduler's queue.
+    """
+
+    def _fallback(self):
+        if _in_fallback.get():
+            return None, None
+        timeout, fallback = model_router.timeout(self.tier), model_router.fallback(self.tier)
+        if not timeout or not fallback or fallback == self.tier:
+            return None, None
+        return timeout, fallback
+
+    def _response_timeout(self) -> float | None:
+        return self._fallback()[0]
+
+    async def _inner_get_chat_message_contents(self, chat_history, settings, *args, **kwargs):
+        timeout, fallback = self._fallback()
+        if timeout is None:
+            return await super()._inner_get_chat_message_contents(chat_history, settings, *args, **kwargs)
+        try:
+            # Services fill in the settings (model, messages), so each attempt gets its own copy
+            return await super()._inner_get_chat_message_contents(
+                chat_history, settings.model_copy(), *args, **kwargs)
+        except asyncio.TimeoutError:
+            annotate(fallback_tier=fallback)
+            token = _in_fallback.set(True)
+            try:
+                return await self.fallback_service(fallback)._inner_get_chat_message_contents(
+                    chat_history, settings.model_copy(), *args, **kwargs)
+            finally:
+                _reset_fallback(token)
+
+    async def _inner_get_streaming_chat_message_contents(self, chat_history, settings, *args, **kwargs):
+        timeout, fallback = self._fallback()
+        stream = super()._inner_get_streaming_chat_message_contents(
+            chat_history, settings.model_copy() if timeout else settings, *args, **kwargs)
+        if timeout is None:
+            async for messages in stream:
+                yield messages
+            return
+
+        try:
+            first = await anext(stream)
+        except StopAsyncIteration:
+            return
+        except asyncio.TimeoutError:
+            await stream.aclose()
+            annotate(fallback_tier=fallback)
+            token = _in_fallback.set(True)
+            try:
+                async for messages in self.fallback_service(fallback)._inner_get_streaming_chat_message_contents(
+                        chat_history, settings.model_copy(), *args, **kwargs):
+                    yield messages
+            finally:
+                _reset_fallback(token)
+            return
+
+        yield first
+        async for messages in stream:
+            yield messages
@@ -0,0 +1,104 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from contextlib import closing
+
+from cache import TTLCache
+from telemetry import annotate
+
+
+FILLER_WORDS = {"a", "an", "the", "please", "can", "could", "you", "me", "some", "any", "for", "to"}
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Folds case, punctuation, filler words and simple plurals, keeping word order."""
+    words = []
+    for word in re.findall(r"[\w#+.-]+", prompt.lower()):
+        word = word.strip(".-")
+        if not word or word in FILLER_WORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return " ".join(words)
+
+
+def conversation_context(messages) -> str:
+    """The text of the conversation before a prompt, for keys of answers that depend on it."""
+    return "\n".join(f"{message.role.value}:{message.name or ''}:{message.content or ''}" for message in messages)
+
+
+class ResponseCache:
+    """Opt-in cache of model responses, keyed on a normalized prompt plus tool outputs.
+
+    Entries live in an in-memory TTL/LRU tier and, when `sqlite_path` is set, in a
+    SQLite file shared by restarts and workers on the same host. Caching is enabled
+    per agent (or flow) name; `"*"` enables every name.
+    """
+
+    def __init__(self, enabled_names: set[str], ttl: float = 3600, max_size: int = 512,
+                 sqlite_path: str | None = None):
+        self.enabled_names = enabled_names
+        self.ttl = ttl
+        self.memory = TTLCache(max_size=max_size, ttl=ttl)
+        self.sqlite_path = sqlite_path
+
+    def enabled_for(self, name: str) -> bool:
+        return "*" in self.enabled_names or name in self.enabled_names
+
+    def make_key(self, name: str, prompt: str, *context: str) -> str:
+        """Builds a key from the agent/flow name, the normalized prompt and any tool outputs it depends on."""
+        digest = hashlib.sha256(f"{name}\0{normalize_prompt(prompt)}".encode("utf-8"))
+        for item in context:
+            digest.update(b"\0" + hashlib.sha256(str(item).encode("utf-8")).digest())
+        return digest.hexdigest()
+
+    async def get(self, key: str):
+        value = self.memory.get(key)
+        if value is None and self.sqlite_path:
+            value = await asyncio.to_thread(self._sqlite_get, key)
+            if value is not None:
+                self.memory.set(key, value)
+        annotate(response_cache_hit=value is not None)
+        return value
+
+    async def set(self, key: str, value) -> None:
+        self.memory.set(key, value)
+        if self.sqlite_path:
+            await asyncio.to_thread(self._sqlite_set, key, value)
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.sqlite_path)
+        db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT, expires REAL)")
+        return db
+
+    def _sqlite_get(self, key: str):
+        with closing(self._connect()) as db:
+            row = db.execute("SELECT value, expires FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def _sqlite_set(self, key: str, value) -> None:
+        with closing(self._connect()) as db, db:
+            db.execute("INSERT OR REPLACE INTO responses (key, value, expires) VALUES (?, ?, ?)",
+                       (key, json.dumps(value), time.time() + self.ttl))
+
+
+def create_response_cache() -> ResponseCache:
+    """Configured from the environment. RESPONSE_CACHE_AGENTS lists the agent or flow names
+    to cache (comma separated, "*" for all); when it is empty nothing is cached."""
+    names = {name.strip() for name in os.getenv("RESPONSE_CACHE_AGENTS", "").split(",") if name.strip()}
+    return ResponseCache(
+        enabled_names=names,
+        ttl=float(os.getenv("RESPONSE_CACHE_TTL", "3600")),
+        max_size=int(os.getenv("RESPONSE_CACHE_SIZE", "512")),
+        sqlite_path=os.getenv("RESPONSE_CACHE_SQLITE") or None,
+    )
+
+
+response_cache = create_response_cache()
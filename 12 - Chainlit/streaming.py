@@ -0,0 +1,174 @@
+import asyncio
+import os
+
+from semantic_kernel.agents import AgentGroupChat
+from semantic_kernel.agents.group_chat.broadcast_queue import ChannelReference
+from semantic_kernel.exceptions import AgentChatException
+
+
+STREAM_FLUSH_INTERVAL = float(os.getenv("STREAM_FLUSH_INTERVAL", "0.05"))
+STREAM_FLUSH_BYTES = int(os.getenv("STREAM_FLUSH_BYTES", "256"))
+STREAM_MAX_PENDING_BYTES = int(os.getenv("STREAM_MAX_PENDING_BYTES", "65536"))
+
+
+class TokenCoalescer:
+    """Batches model tokens before streaming them to a Chainlit message.
+
+    Tokens are buffered and sent as one websocket frame every `interval` seconds, or
+    sooner once `max_bytes` are waiting. Sending happens in a background task so the
+    model stream keeps flowing while a frame is in flight; if the client falls more
+    than `max_pending` bytes behind, `write` waits for the buffer to drain.
+    Call `flush()` at boundaries (function calls and results, agent changes).
+    """
+
+    def __init__(self, message, interval: float = STREAM_FLUSH_INTERVAL,
+                 max_bytes: int = STREAM_FLUSH_BYTES, max_pending: int = STREAM_MAX_PENDING_BYTES):
+        self.message = message
+        self.interval = interval
+        self.max_bytes = max_bytes
+        self.max_pending = max_pending
+        self._buffer = []
+        self._size = 0
+        self._ready = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._send_lock = asyncio.Lock()
+        self._task = None
+        self._closing = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            await self.close()
+        except Exception:
+            if exc is None:
+                raise  # Otherwise the block's own error is the one worth reporting
+
+    async def write(self, token: str) -> None:
+        if not token:
+            return
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        self._raise_if_stopped()
+        self._buffer.append(token)
+        self._size += len(token.encode("utf-8"))
+        if self._size >= self.max_bytes:
+            self._ready.set()
+        while self._size >= self.max_pending:
+            self._drained.clear()
+            await self._drained.wait()
+            self._raise_if_stopped()
+
+    def _raise_if_stopped(self) -> None:
+        # The sender task ends early when stream_token fails (e.g. the client went away);
+        # its error is re-raised here rather than waiting for a drain that never comes
+        if self._task.done() and not self._closing:
+            self._task.result()
+            raise RuntimeError("TokenCoalescer sender stopped")
+
+    async def flush(self) -> None:
+        await self._send()
+
+    async def close(self) -> None:
+        # Let the sender task finish its current frame rather than cancelling it mid-send
+        self._closing = True
+        self._ready.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self._send()
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._ready.wait(), timeout=self.interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._ready.clear()
+                await self._send()
+                if self._closing:
+                    return
+        finally:
+            self._drained.set()  # Wakes a writer waiting on a sender that has stopped
+
+    async def _send(self) -> None:
+        # Taking the buffer under the lock keeps frames in order when flush() races the task
+        async with self._send_lock:
+            if not self._buffer:
+                return
+            chunk = "".join(self._buffer)
+            self._buffer.clear()
+            self._size = 0
+            self._drained.set()
+            await self.message.stream_token(chunk)
+
+
+class StreamingAgentGroupChat(AgentGroupChat):
+    """AgentGroupChat whose `invoke_stream()` records the agents' replies like `invoke()` does.
+
+    Semantic Kernel's streaming path leaves each reply only on the speaking agent's
+    channel thread, so the shared history (read by the selection and termination
+    strategies, and stored with the session) and the other agents' channels never see
+    it. Once an agent has finished streaming, the messages it added to its thread are
+    copied to its channel, the shared history and the other channels, before the
+    termination strategy runs.
+    """
+
+    async def invoke_stream(self, agent=None, is_joining: bool = True):
+        # Same loop as AgentGroupChat.invoke_stream, which calls the base class's
+        # invoke_agent_stream directly and so would bypass the override below
+        if agent is not None:
+            if is_joining:
+                self.add_agent(agent)
+            async for message in self.invoke_agent_stream(agent):
+                yield message
+            self.is_complete = await self.termination_strategy.should_terminate(agent, self.history.messages)
+            return
+
+        if not self.agents:
+            raise AgentChatException("No agents are available")
+        if self.is_complete:
+            if not self.termination_strategy.automatic_reset:
+                raise AgentChatException("Chat is already complete")
+            self.is_complete = False
+
+        for _ in range(self.termination_strategy.maximum_iterations):
+            try:
+                selected_agent = await self.selection_strategy.next(self.agents, self.history.messages)
+            except Exception as ex:
+                raise AgentChatException("Failed to select agent") from ex
+
+            async for message in self.invoke_agent_stream(selected_agent):
+                yield message
+
+            self.is_complete = await self.termination_strategy.should_terminate(selected_agent, self.history.messages)
+            if self.is_complete:
+                break
+
+    async def invoke_agent_stream(self, agent):
+        channel = await self._get_or_create_channel(agent)
+        thread = getattr(channel, "thread", None)
+        history_count = len(self.history.messages)
+        thread_count = len([message async for message in thread.get_messages()]) if thread is not None else 0
+
+        async for message in super().invoke_agent_stream(agent):
+            yield message
+
+        if thread is None or len(self.history.messages) > history_count:
+            return  # Not a chat history channel, or already recorded by Semantic Kernel
+        # The thread starts the turn with the channel's last message, the agent's prompt
+        prompt = channel.messages[-1] if channel.messages else None
+        replies = [message async for message in thread.get_messages()][thread_count:]
+        replies = [message for message in replies if message is not prompt]
+        for message in replies:
+            # Marks the reply as already on the thread, so it isn't added again when it
+            # becomes the prompt of the next agent sharing this channel
+            message.metadata["thread_id"] = thread.id
+        channel.messages.extend(replies)
+        self.history.messages.extend(replies)
+        await self.broadcast_queue.enqueue(
+            [ChannelReference(channel=other, hash=key) for key, other in self.agent_channels.items()
+             if other is not channel],
+            replies)
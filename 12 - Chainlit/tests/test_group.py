@@ -0,0 +1,117 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from semantic_kernel.agents import ChatCompletionAgent  # noqa: E402
+from semantic_kernel.connectors.ai.open_ai import OpenAIChatCompletion  # noqa: E402
+from semantic_kernel.agents.strategies.termination.termination_strategy import TerminationStrategy  # noqa: E402
+from semantic_kernel.contents import AuthorRole, ChatMessageContent  # noqa: E402
+
+from group import ConciergeSelectionStrategy, ConciergeTerminationStrategy, classify_approval  # noqa: E402
+from history import SUMMARY_PREFIX  # noqa: E402
+
+SERVICE = OpenAIChatCompletion(ai_model_id="fake", api_key="fake")
+AGENTS = [ChatCompletionAgent(service=SERVICE, name=name, instructions="Be brief.")
+          for name in ("FrontDesk", "Concierge", "WeatherConditionsAgent")]
+
+
+def selection_strategy(**kwargs) -> ConciergeSelectionStrategy:
+    return ConciergeSelectionStrategy(
+        weather_name="WeatherConditionsAgent", front_desk_name="FrontDesk", reviewer_name="Concierge", **kwargs)
+
+
+def user(content: str = "Things to do in Paris") -> ChatMessageContent:
+    return ChatMessageContent(role=AuthorRole.USER, content=content)
+
+
+def reply(name: str) -> ChatMessageContent:
+    return ChatMessageContent(role=AuthorRole.ASSISTANT, name=name, content=f"{name} reply")
+
+
+def select(strategy: ConciergeSelectionStrategy, history: list) -> str:
+    return asyncio.run(strategy.next(AGENTS, history)).name
+
+
+def test_turn_order():
+    strategy = selection_strategy()
+    history = [user()]
+    speakers = []
+    for _ in range(5):
+        speakers.append(select(strategy, history))
+        history.append(reply(speakers[-1]))
+    assert speakers == ["WeatherConditionsAgent", "FrontDesk", "Concierge", "FrontDesk", "Concierge"]
+
+    # The weather agent only speaks once per conversation
+    history.append(user("And in London?"))
+    assert select(strategy, history) == "FrontDesk"
+
+
+def test_weather_agent_stays_done_after_its_reply_is_summarized():
+    strategy = selection_strategy()
+    assert select(strategy, [user()]) == "WeatherConditionsAgent"
+
+    # What reduce_group_chat leaves once the weather reply is folded into the summary
+    reduced = [ChatMessageContent(role=AuthorRole.SYSTEM, content=f"{SUMMARY_PREFIX}\nIt is sunny in Paris."),
+               reply("Concierge"), reply("FrontDesk"), user("Anything for tonight?")]
+    assert select(strategy, reduced) == "FrontDesk"
+
+
+def test_restored_strategy_knows_the_weather_agent_spoke():
+    reduced = [ChatMessageContent(role=AuthorRole.SYSTEM, content=f"{SUMMARY_PREFIX}\nIt is sunny in Paris."),
+               user("Anything for tonight?")]
+    assert select(selection_strategy(), reduced) == "WeatherConditionsAgent"
+    assert select(selection_strategy(weather_spoken=True), reduced) == "FrontDesk"
+
+
+def test_initial_agent_is_selected_first():
+    strategy = selection_strategy(initial_agent=AGENTS[1])
+    assert select(strategy, [user()]) == "Concierge"
+    assert select(strategy, [user()]) == "WeatherConditionsAgent"
+
+
+def test_classify_approval():
+    assert classify_approval("This recommendation is approved.") is True
+    assert classify_approval("Perfect choice! Approved.") is True
+    assert classify_approval("I cannot approve this yet.") is False
+    assert classify_approval("Consider a quieter neighbourhood instead.") is False
+    # Conditional approvals and mixed signals are left to the LLM
+    assert classify_approval("I would approve this if it were less touristy.") is None
+    assert classify_approval("It will be approved once it avoids the crowds.") is None
+    assert classify_approval("Approved, however consider going earlier.") is None
+    assert classify_approval("Sounds lovely.") is None
+
+
+class RecordingTermination(TerminationStrategy):
+    """Stands in for the LLM termination prompt, recording the history it is given."""
+
+    histories: list = []
+
+    async def should_agent_terminate(self, agent, history):
+        self.histories.append(list(history))
+        return True
+
+
+def test_termination_decides_locally_and_falls_back_when_unsure():
+    fallback = RecordingTermination(histories=[])
+    strategy = ConciergeTerminationStrategy(agents=[AGENTS[1]], reviewer_name="Concierge", fallback=fallback)
+    concierge = AGENTS[1]
+
+    def terminate(*contents):
+        history = [user()] + [ChatMessageContent(role=AuthorRole.ASSISTANT, name=name, content=content)
+                              for name, content in contents]
+        return asyncio.run(strategy.should_agent_terminate(concierge, history))
+
+    assert terminate(("FrontDesk", "Visit the market."), ("Concierge", "Approved.")) is True
+    assert terminate(("FrontDesk", "Visit the tower."), ("Concierge", "Reconsider, it is touristy.")) is False
+    assert strategy.decisions == {"local": 2, "llm": 0}
+    assert strategy.last_decision == "local"
+
+    contents = [("FrontDesk", f"Idea {i}.") for i in range(5)]
+    contents.append(("Concierge", "I would approve this if it were less touristy."))
+    assert terminate(*contents) is True
+    assert strategy.decisions == {"local": 2, "llm": 1}
+    assert strategy.last_decision == "llm"
+    # The LLM only sees the last `window` messages
+    assert len(fallback.histories[-1]) == strategy.window